@@ -2,22 +2,81 @@ import sys
 import os
 import subprocess
 import shutil
+import tarfile
+import io
+import gc
+import mmap
 import json
 import re
+import time
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 import xml.etree.ElementTree as ET
 from xml.etree.ElementTree import ParseError
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
+from xml.sax.saxutils import escape, quoteattr
+try:
+    # lxml (libxml2) es opcional: si está instalado acelera mucho el parseo y la escritura de XML
+    from lxml import etree as LET
+except ImportError:
+    LET = None
+try:
+    # zstandard es opcional: si está instalado, el resultado se comprime en .tar.zst en lugar de .tar
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+try:
+    # orjson es opcional: si está instalado, carga la configuración más rápido que json
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QFileDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QComboBox,
     QLabel, QPushButton, QLineEdit, QProgressBar, QTextEdit, QMenuBar, QMenu, QMessageBox, QCheckBox, QDialog, QDialogButtonBox
 )
-from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtCore import Qt, QThread, QTimer, Signal, QFileSystemWatcher
 from PySide6.QtGui import QFont, QAction
 
-CONFIG_FILE = "compilador_config.json"
+# Botones de las preguntas de confirmación (Sí/No, con "No" por defecto)
+_YES = QMessageBox.StandardButton.Yes
+_NO = QMessageBox.StandardButton.No
+_YES_NO = _YES | _NO
 
+CONFIG_FILE = "compilador_config.json"
+# Ruta absoluta del archivo de configuración (junto a este script), calculada una sola vez
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), CONFIG_FILE)
+
+_ERRORES_XML = (ParseError,) if LET is None else (ParseError, LET.XMLSyntaxError)
+
+# Etiquetas de formato de RimWorld (color, size, b, i), que no son XML válido dentro del texto.
+# Usamos un patrón más robusto que maneja atributos con espacios y comillas
+# (patrón de bytes: el contenido se procesa sin decodificar)
+_RIMWORLD_TAG_RE = re.compile(rb'<(/?(?:color|size|b|i)(?:\s+[^>]*?)?)>', re.IGNORECASE)
+# Prefijos que deben aparecer para que _RIMWORLD_TAG_RE pueda encontrar algo
+_RIMWORLD_TAG_PISTAS = (b'<color', b'<size', b'<b', b'<i', b'</color', b'</size', b'</b', b'</i')
+_BOM_UTF8 = b'\xef\xbb\xbf'
+_BOMS_UTF16 = (b'\xff\xfe', b'\xfe\xff')
+# Los mismos bytes de espacio que quita bytes.strip()
+_ESPACIOS = frozenset(b' \t\n\r\x0b\x0c')
+# A partir de este tamaño los archivos de origen se leen con mmap en lugar de read()
+_MMAP_MINIMO = 64 * 1024
+# Buffer de escritura de los XML procesados (1 MB): pocas llamadas write() incluso en archivos grandes
+_BUFFER_ESCRITURA = 1024 * 1024
+# Segmentos finales que empiezan por "(" y contienen un ")" (ver normalizar_nombre_idioma)
+_PARENTESIS_FINAL_RE = re.compile(r'(?:\([^(]*\)[^(]*)+$')
+# Cada cuántos archivos procesados hace cada proceso una recolección gc de generación 1
+_GC_CADA = 100
+_archivos_desde_gc = 0
+# Carpetas de un mod que comúnmente no son de idiomas (en minúsculas), ignoradas al detectar idiomas
+_CARPETAS_A_IGNORAR = frozenset({'about', 'defs', 'assemblies', 'patches', 'textures', 'sounds', 'common', 'ideasshared', 'licenses', 'source', 'src', 'docs', 'examples', '.git', '.vs', '1.0', '1.1', '1.2', '1.3', '1.4', '1.5'})
+# Bloque <forceLoadAfter> de un about.xml (vacío o con contenido) y sus <li>, para modificarlo sobre los bytes
+_FORCE_LOAD_RE = re.compile(rb'<forceLoadAfter\b[^>]*?(?:/>|>.*?</forceLoadAfter>)', re.DOTALL)
+_LI_RE = re.compile(rb'<li>(.*?)</li>', re.DOTALL)
+# Clave de ordenación de los fragmentos (tag, bytes, cola) de _escribir_xml_ordenado
+_POR_TAG = itemgetter(0)
+
+@lru_cache(maxsize=64)
 def normalizar_nombre_idioma(nombre: str) -> str:
     """
     Normaliza el nombre de la carpeta de idioma para usarlo como carpeta de salida.
@@ -25,6 +84,7 @@ def normalizar_nombre_idioma(nombre: str) -> str:
       desde la primera ocurrencia de " (" en adelante. Ej: "Spanish (Español(Castellano))" -> "Spanish".
     - Si no existe el patrón " (", se intenta eliminar cualquier segmento final entre paréntesis,
       incluso con anidación, recortando desde el último "(" hasta el final mientras haya pares ().
+    El resultado se cachea: los mismos nombres de idioma se repiten en cada mod.
     """
     if not isinstance(nombre, str):
         return ""
@@ -33,35 +93,279 @@ def normalizar_nombre_idioma(nombre: str) -> str:
     corte = nombre.find(" (")
     if corte != -1:
         return nombre[:corte].strip()
-    # Fallback: eliminar segmentos entre paréntesis al final (maneja anidación simple)
-    s = nombre
-    while True:
-        open_idx = s.rfind("(")
-        close_idx = s.rfind(")")
-        if open_idx != -1 and close_idx != -1 and close_idx > open_idx:
-            s = s[:open_idx].rstrip()
-        else:
-            break
-    return s.strip()
+    # Fallback: eliminar segmentos entre paréntesis al final (maneja anidación simple) en una sola búsqueda
+    m = _PARENTESIS_FINAL_RE.search(nombre)
+    return nombre[:m.start()].strip() if m else nombre
 
-def indent_xml(elem, level=0, space="  "):
+def _procesar_archivo(tarea):
+    """
+    Procesa un único archivo XML de traducción: lo copia tal cual o, si se pidió,
+    elimina comentarios y ordena sus etiquetas.
+    Se ejecuta en un proceso aparte (ProcessPoolExecutor), por eso es una función de módulo
+    que solo recibe y devuelve datos serializables.
+    Devuelve una tupla (mod, ok, ruta_destino_archivo, mensaje_de_error_o_None).
+    """
+    mod, ruta_origen, ruta_destino_archivo, eliminar_comentarios = tarea
+    try:
+        # La carpeta de destino ya la creó CopiadorThread al listar las tareas
+        if not eliminar_comentarios:
+            shutil.copyfile(ruta_origen, ruta_destino_archivo)
+            return (mod, True, ruta_destino_archivo, None)
+
+        try:
+            # Leemos el contenido completo para limpiar caracteres invisibles.
+            # Los archivos grandes se mapean en memoria: solo se copia el tramo útil del XML.
+            with open(ruta_origen, 'rb') as f:
+                if os.fstat(f.fileno()).st_size >= _MMAP_MINIMO:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        raw_data = _extraer_xml(mm)
+                else:
+                    raw_data = _extraer_xml(f.read())
+
+            # Escapar etiquetas de formato de RimWorld (color, size, b, i) para evitar errores
+            # Esto convierte <color...> en &lt;color...&gt; para que sea XML válido
+            # La mayoría de archivos no tiene ninguna: una búsqueda de subcadenas evita recorrerlos con el regex
+            low = raw_data.lower()
+            if any(pista in low for pista in _RIMWORLD_TAG_PISTAS):
+                raw_data = _RIMWORLD_TAG_RE.sub(rb'&lt;\1&gt;', raw_data)
+
+            # Parsear el contenido limpio, ordenar, re-indentar y escribir en el archivo de destino
+            _escribir_xml_ordenado(raw_data, ruta_destino_archivo)
+            del raw_data
+            _recolectar_periodicamente()
+            return (mod, True, ruta_destino_archivo, None)
+        except _ERRORES_XML as e_parse:
+            # Si falla el parseo, es más seguro copiar el archivo original
+            shutil.copyfile(ruta_origen, ruta_destino_archivo)
+            msg = f"Error de formato XML en '{ruta_origen}', no se pudo procesar. Copiando tal cual. Error: {e_parse}"
+            return (mod, True, ruta_destino_archivo, msg)
+    except Exception as e_process:
+        return (mod, False, ruta_destino_archivo, f"Error procesando '{ruta_origen}': {e_process}")
+
+def _extraer_xml(buf):
+    """
+    Devuelve como bytes UTF-8 el XML contenido en `buf` (bytes o mmap), sin BOM, sin espacios
+    al inicio/final y sin la declaración <?xml ...?>.
+    Los límites se calculan por posiciones, así el contenido se copia una sola vez.
     """
-    Función para indentar un árbol de ElementTree para una mejor legibilidad (pretty-printing).
-    Modifica el árbol XML en su lugar.
+    # Trabajamos directamente sobre los bytes UTF-8, sin decodificar a str y volver a codificar.
+    # Solo los archivos que realmente estén en UTF-16 (detectados por su BOM) se recodifican.
+    inicio = 0
+    if buf[:2] in _BOMS_UTF16:
+        buf = buf[:].decode('utf-16').encode('utf-8')
+    elif buf[:3] == _BOM_UTF8:
+        # BOM de VS Code
+        inicio = 3
+    fin = len(buf)
+
+    # Limpieza crítica: eliminamos espacios y saltos de línea al inicio/final
+    while inicio < fin and buf[inicio] in _ESPACIOS:
+        inicio += 1
+    while fin > inicio and buf[fin - 1] in _ESPACIOS:
+        fin -= 1
+
+    # Si el XML tiene una declaración de encoding (ej: encoding="utf-16"), ya no coincide
+    # con los bytes UTF-8 que le pasamos al parser. La removemos.
+    if buf[inicio:inicio + 5] == b"<?xml":
+        # Buscamos el final de la etiqueta de declaración ?>
+        fin_declaracion = buf.find(b"?>", inicio, fin)
+        if fin_declaracion != -1:
+            inicio = fin_declaracion + 2
+            while inicio < fin and buf[inicio] in _ESPACIOS:
+                inicio += 1
+    return buf[inicio:fin]
+
+def _escribir_xml_ordenado(datos, ruta_destino_archivo):
     """
-    i = "\n" + level * space
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + space
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for subelem in elem:
-            indent_xml(subelem, level + 1, space)
-        if not subelem.tail or not subelem.tail.strip():
-            subelem.tail = i
+    Parsea en streaming (iterparse) el XML en `datos` (bytes UTF-8) sin comentarios y lo escribe
+    en `ruta_destino_archivo` con los hijos de la raíz ordenados alfabéticamente por su tag.
+    Cada hijo de la raíz se indenta, se serializa y se libera del árbol en cuanto está completo,
+    así en memoria solo queda un hijo a la vez más sus fragmentos ya serializados.
+    No escribe nada si el XML es inválido (propaga la excepción del parser).
+    """
+    if LET is not None:
+        eventos = LET.iterparse(io.BytesIO(datos), events=('start', 'end'),
+                                remove_comments=True, remove_pis=True, remove_blank_text=True)
+        tostring = LET.tostring
+        indentar = LET.indent
     else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
+        # El TreeBuilder por defecto de ElementTree ya descarta comentarios
+        eventos = ET.iterparse(io.BytesIO(datos), events=('start', 'end'))
+        tostring = ET.tostring
+        indentar = ET.indent
+
+    root = None
+    pendiente = None
+    profundidad = 0
+    fragmentos = []
+
+    def liberar_pendiente():
+        # El texto tras un hijo (tail) solo está completo cuando empieza el siguiente o se cierra la raíz
+        cola = pendiente.tail if pendiente.tail and pendiente.tail.strip() else None
+        indentar(pendiente, space="  ", level=1)
+        pendiente.tail = None
+        fragmentos.append((pendiente.tag, tostring(pendiente, encoding='utf-8'), cola))
+        pendiente.clear()
+        del root[0]
+
+    for evento, elem in eventos:
+        if evento == 'start':
+            if root is None:
+                root = elem
+            elif profundidad == 1 and pendiente is not None:
+                liberar_pendiente()
+                pendiente = None
+            profundidad += 1
+            continue
+        profundidad -= 1
+        if profundidad == 1:
+            pendiente = elem
+        elif profundidad == 0 and pendiente is not None:
+            liberar_pendiente()
+
+    # Ordenar los elementos hijos de la raíz (LanguageData) alfabéticamente por su tag
+    fragmentos.sort(key=_POR_TAG)
+
+    tag = root.tag
+    atributos = ''.join(f' {k}={quoteattr(v)}' for k, v in root.attrib.items())
+    texto_raiz = root.text
+    # Del árbol ya solo se necesitaban estos datos: se libera antes de escribir
+    root.clear()
+    del root, eventos
+    with open(ruta_destino_archivo, 'wb', buffering=_BUFFER_ESCRITURA) as out:
+        out.write(b"<?xml version='1.0' encoding='utf-8'?>\n")
+        if not fragmentos:
+            if texto_raiz:
+                out.write(f'<{tag}{atributos}>{escape(texto_raiz)}</{tag}>'.encode('utf-8'))
+            else:
+                out.write(f'<{tag}{atributos} />'.encode('utf-8'))
+            return
+        texto = escape(texto_raiz) if texto_raiz and texto_raiz.strip() else '\n  '
+        out.write(f'<{tag}{atributos}>{texto}'.encode('utf-8'))
+        ultimo = len(fragmentos) - 1
+        for i, (_, fragmento, cola) in enumerate(fragmentos):
+            out.write(fragmento)
+            if cola:
+                out.write(escape(cola).encode('utf-8'))
+            else:
+                out.write(b'\n  ' if i < ultimo else b'\n')
+        out.write(f'</{tag}>\n'.encode('utf-8'))
+
+def _recolectar_periodicamente():
+    """
+    Cada _GC_CADA archivos escritos por este proceso, lanza una recolección de generación 1
+    para que los nodos temporales del parseo no se acumulen hasta una recolección completa.
+    """
+    global _archivos_desde_gc
+    _archivos_desde_gc += 1
+    if _archivos_desde_gc >= _GC_CADA:
+        _archivos_desde_gc = 0
+        gc.collect(1)
+
+def _leer_package_id(ruta):
+    """
+    Devuelve el <packageId> hijo directo de la raíz de un About.xml (en minúsculas) o None.
+    Lee con iterparse y se detiene en cuanto lo encuentra, sin construir el árbol completo
+    (los <packageId> anidados, p. ej. en modDependencies, se ignoran igual que con root.find).
+    """
+    profundidad = 0
+    with open(ruta, 'rb') as f:
+        for evento, elem in ET.iterparse(f, events=('start', 'end')):
+            if evento == 'start':
+                profundidad += 1
+                continue
+            profundidad -= 1
+            if profundidad == 1:
+                if elem.tag == "packageId":
+                    return elem.text.strip().lower() if elem.text else None
+                elem.clear()
+    return None
+
+def _bloque_force_load(datos, inicio, ids_mods):
+    """
+    Genera los bytes del bloque <forceLoadAfter> con `ids_mods`, indentado igual que la línea
+    de `datos` donde empieza (posición `inicio`) y con un nivel más para cada <li>.
+    """
+    linea = datos[datos.rfind(b"\n", 0, inicio) + 1:inicio]
+    sangria = linea if not linea.strip() else b""
+    if not ids_mods:
+        return b"<forceLoadAfter />"
+    sangria_li = sangria + (b"\t" if b"\t" in sangria else b"  ")
+    lineas = [b"<forceLoadAfter>"]
+    lineas.extend(sangria_li + b"<li>" + escape(pid).encode('utf-8') + b"</li>" for pid in ids_mods)
+    lineas.append(sangria + b"</forceLoadAfter>")
+    return b"\n".join(lineas)
+
+def _tiene_published_id(ruta_mod):
+    """Indica si el mod tiene PublishedFileId.txt en su carpeta raíz o en About/ (un scandir por carpeta)."""
+    for carpeta in (ruta_mod, os.path.join(ruta_mod, "About")):
+        try:
+            with os.scandir(carpeta) as it:
+                if any(e.name == "PublishedFileId.txt" and e.is_file() for e in it):
+                    return True
+        except OSError:
+            continue
+    return False
+
+def _contar_xml(raiz):
+    """Cuenta los archivos .xml bajo `raiz` recorriendo con os.scandir y una pila (sin seguir enlaces)."""
+    pila = [raiz]
+    total = 0
+    while pila:
+        carpeta = pila.pop()
+        try:
+            it = os.scandir(carpeta)
+        except OSError:
+            continue # Ignorar carpetas a las que no se puede acceder
+        with it:
+            for entrada in it:
+                if entrada.is_dir(follow_symlinks=False):
+                    pila.append(entrada.path)
+                elif entrada.name.endswith(".xml"):
+                    total += 1
+    return total
+
+def _volcar_archivo_tar(tar, info, ruta, usar_sendfile):
+    """
+    Añade al tar un archivo regular ya descrito por `info`.
+    Con os.sendfile (Linux) el contenido pasa del archivo origen al .tar dentro del kernel,
+    sin atravesar buffers de Python; en otro caso se usa addfile con copias de 1 MB.
+    """
+    with open(ruta, 'rb') as src:
+        if not usar_sendfile or info.size == 0:
+            tar.addfile(info, src)
+            return
+        # Misma escritura que TarFile.addfile: cabecera, datos y relleno hasta el bloque de 512 bytes
+        destino = tar.fileobj
+        cabecera = info.tobuf(tar.format, tar.encoding, tar.errors)
+        destino.write(cabecera)
+        destino.flush()
+        fd_destino, fd_origen = destino.fileno(), src.fileno()
+        restante = info.size
+        while restante > 0:
+            enviados = os.sendfile(fd_destino, fd_origen, None, restante)
+            if enviados == 0:
+                raise OSError(f"El archivo cambió de tamaño durante la compresión: {ruta}")
+            restante -= enviados
+        bloques, resto = divmod(info.size, tarfile.BLOCKSIZE)
+        if resto:
+            destino.write(tarfile.NUL * (tarfile.BLOCKSIZE - resto))
+            bloques += 1
+        tar.offset += len(cabecera) + bloques * tarfile.BLOCKSIZE
+        tar.members.append(info)
+
+def _agregar_arbol_tar(tar, ruta, arcname, usar_sendfile):
+    """Añade `ruta` y todo su contenido al tar, en el mismo orden que TarFile.add (entradas ordenadas)."""
+    info = tar.gettarinfo(ruta, arcname)
+    if info.isreg():
+        _volcar_archivo_tar(tar, info, ruta, usar_sendfile)
+        return
+    tar.addfile(info)
+    if info.isdir():
+        with os.scandir(ruta) as it:
+            entradas = sorted((e.name, e.path) for e in it)
+        for nombre, sub in entradas:
+            _agregar_arbol_tar(tar, sub, f"{arcname}/{nombre}", usar_sendfile)
 
 class CopiadorThread(QThread):
     progreso = Signal(int)
@@ -69,7 +373,6 @@ class CopiadorThread(QThread):
     error_log = Signal(str)
     terminado = Signal(int)
     mods_count = Signal(int, int)  # mods_procesados, total_mods
-    archivos_count = Signal(int)  # archivos_copiados
 
     def __init__(self, origen, destino, nombre_subcarpeta, limpiar_destino=False, eliminar_comentarios=False, parent=None):
         super().__init__(parent)
@@ -85,9 +388,9 @@ class CopiadorThread(QThread):
         self.nombre_destino = normalizar_nombre_idioma(nombre_subcarpeta)
         self.archivos_copiados = 0
         self.mods_procesados = []
-        # Lock para sincronizar acceso a variables compartidas en threads
-        self._lock = Lock()
         self._mods_procesados_count = 0
+        # Carpetas de destino ya creadas, para no repetir os.makedirs por cada archivo
+        self._carpetas_creadas = set()
 
     def run(self):
         try:
@@ -110,7 +413,14 @@ class CopiadorThread(QThread):
                 self.log.emit("Opción 'Eliminar comentarios XML' está activada.")
 
             # Obtener lista de mods a procesar
-            mods_a_procesar = [d for d in os.listdir(self.origen) if os.path.isdir(os.path.join(self.origen, d, self.nombre_subcarpeta))]
+            with os.scandir(self.origen) as entradas:
+                carpetas_mod = [e for e in entradas if e.is_dir()]
+            # Comprobar la carpeta de idioma de todos los mods a la vez: es solo E/S (stat), que libera
+            # el GIL, así que aquí sí convienen threads. Ayuda en carpetas de red o de Workshop lentas.
+            with ThreadPoolExecutor(max_workers=32) as executor:
+                rutas_idioma = [os.path.join(e.path, self.nombre_subcarpeta) for e in carpetas_mod]
+                tiene_idioma = executor.map(os.path.isdir, rutas_idioma)
+                mods_a_procesar = [e.name for e, ok in zip(carpetas_mod, tiene_idioma) if ok]
             self.mods_procesados = mods_a_procesar
 
             if not mods_a_procesar:
@@ -120,23 +430,55 @@ class CopiadorThread(QThread):
 
             total_mods = len(mods_a_procesar)
             self.log.emit(f"Se encontraron {total_mods} mods para procesar.")
-            self.log.emit(f"Procesamiento paralelo: usando hasta 4 threads simultáneos para mayor velocidad.")
             self._mods_procesados_count = 0
 
-            # Procesar mods en paralelo usando ThreadPoolExecutor
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                # Enviar todos los mods para procesamiento paralelo
-                futures = {executor.submit(self._procesar_mod, mod, total_mods): mod 
-                          for mod in mods_a_procesar}
-                
-                # Ir obteniendo resultados conforme terminan
-                for future in as_completed(futures):
-                    mod_name = futures[future]
-                    try:
-                        future.result()  # Esto lanzará excepción si el mod falló
-                    except Exception as e:
-                        # Log de error ya fue emitido en _procesar_mod, solo continuar
-                        pass
+            # Aplanar el trabajo a una tarea por archivo XML (no por mod) para repartirlo entre procesos
+            tareas = []
+            archivos_pendientes = {}
+            for mod in mods_a_procesar:
+                try:
+                    tareas_mod = self._listar_tareas_mod(mod)
+                except Exception as e:
+                    # Error específico del mod, registrar pero seguir con los demás
+                    import traceback
+                    msg = f"Error procesando mod '{mod}': {str(e)}"
+                    self.log.emit(msg)
+                    self.error_log.emit(f"{msg}\n{traceback.format_exc()}")
+                    self._marcar_mod_procesado(total_mods)
+                    continue
+                if not tareas_mod:
+                    self.log.emit(f"Sin archivos XML en {mod}, saltando.")
+                    self._marcar_mod_procesado(total_mods)
+                    continue
+                archivos_pendientes[mod] = len(tareas_mod)
+                tareas.extend(tareas_mod)
+
+            if tareas:
+                max_workers = os.cpu_count() or 1
+                self.log.emit(f"Procesamiento paralelo: usando hasta {max_workers} procesos simultáneos para mayor velocidad.")
+                # El parseo XML es trabajo de CPU: con procesos no compite por el GIL como con threads.
+                # Las señales se emiten solo desde este hilo, a medida que llegan los resultados.
+                # executor.map conserva el orden de las tareas, así que los archivos de cada mod llegan
+                # seguidos: sus líneas de log se acumulan y se emiten juntas al terminar el mod.
+                log_buf = []
+                error_buf = []
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    for mod, ok, _, error in executor.map(_procesar_archivo, tareas, chunksize=16):
+                        if error:
+                            log_buf.append(error)
+                            error_buf.append(error)
+                        if ok:
+                            # Sin señal por archivo: la ventana consulta este contador con un QTimer
+                            self.archivos_copiados += 1
+                        archivos_pendientes[mod] -= 1
+                        if archivos_pendientes[mod] == 0:
+                            log_buf.append(f"--- Mod procesado '{mod}' ---")
+                            self.log.emit("\n".join(log_buf))
+                            if error_buf:
+                                self.error_log.emit("\n".join(error_buf))
+                            log_buf.clear()
+                            error_buf.clear()
+                            self._marcar_mod_procesado(total_mods)
 
             self.log.emit(f"Proceso completado. Total de archivos copiados: {self.archivos_copiados}")
             self.terminado.emit(self.archivos_copiados)
@@ -149,122 +491,43 @@ class CopiadorThread(QThread):
             self.error_log.emit(f"{msg}\nDetalles:\n{tb_str}")
             self.terminado.emit(self.archivos_copiados)
 
-    def _procesar_mod(self, mod, total_mods):
-        """Procesa un mod individual. Este método se ejecuta en paralelo por ThreadPoolExecutor."""
-        try:
-            ruta_mod = os.path.join(self.origen, mod)
-            ruta_idioma = os.path.join(ruta_mod, self.nombre_subcarpeta)
-
-            # Contar archivos para el mod actual
-            archivos_del_mod = []
-            for carpeta_raiz, _, archivos in os.walk(ruta_idioma):
-                for archivo in archivos:
-                    if archivo.endswith(".xml"):
-                        archivos_del_mod.append((carpeta_raiz, archivo))
-            
-            total_archivos_mod = len(archivos_del_mod)
-            if total_archivos_mod == 0:
-                self.log.emit(f"Sin archivos XML en {mod}, saltando.")
-                with self._lock:
-                    self._mods_procesados_count += 1
-                    progreso_general = int((self._mods_procesados_count / total_mods) * 100)
-                self.progreso.emit(progreso_general)
-                return
-
-            archivos_procesados_local = 0
-
-            for carpeta_raiz, archivo in archivos_del_mod:
-                ruta_origen = os.path.join(carpeta_raiz, archivo)
-                ruta_relativa = os.path.relpath(carpeta_raiz, ruta_idioma)
-                ruta_destino_base = os.path.join(self.destino, self.nombre_destino)
-                ruta_destino_carpeta = os.path.join(ruta_destino_base, ruta_relativa)
-                os.makedirs(ruta_destino_carpeta, exist_ok=True)
-                nuevo_nombre = f"[{mod}]_{os.path.splitext(archivo)[0]}.xml"
-                ruta_destino_archivo = os.path.join(ruta_destino_carpeta, nuevo_nombre)
-                
-                if self.eliminar_comentarios:
-                    try:
-                        # Usar un parser que ignora comentarios
-                        parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=False))
-
-                        # Leemos el contenido completo para limpiar caracteres invisibles
-                        with open(ruta_origen, 'rb') as f:
-                            raw_data = f.read()
-
-                        # Intentamos decodificar (utf-8-sig maneja el BOM de VS Code automáticamente)
-                        try:
-                            content = raw_data.decode('utf-8-sig')
-                        except UnicodeDecodeError:
-                            # Fallback para archivos que realmente estén en UTF-16
-                            content = raw_data.decode('utf-16')
-
-                        # Limpieza crítica: eliminamos espacios, saltos de línea o nulos al inicio/final
-                        content = content.strip()
-
-                        # Si el XML tiene una declaración de encoding (ej: encoding="utf-16"), 
-                        # al procesarlo como string de Python puede dar error. La removemos.
-                        if content.startswith("<?xml"):
-                            # Buscamos el final de la etiqueta de declaración ?>
-                            content = content.split("?>", 1)[-1].strip()
-
-                        # Escapar etiquetas de formato de RimWorld (color, size, b, i) para evitar errores
-                        # Esto convierte <color...> en &lt;color...&gt; para que sea XML válido
-                        # Usamos un patrón más robusto que maneja atributos con espacios y comillas
-                        content = re.sub(r'<(/?(?:color|size|b|i)(?:\s+[^>]*?)?)>', r'&lt;\1&gt;', content, flags=re.IGNORECASE)
-
-                        # Parseamos desde el string limpio
-                        root = ET.fromstring(content, parser=parser)
-                        
-                        tree = ET.ElementTree(root)
-                        
-                        # Ordenar los elementos hijos de la raíz (LanguageData) alfabéticamente por su tag
-                        root[:] = sorted(root, key=lambda child: child.tag)
-                        # Re-indentar el árbol para un formato limpio y legible
-                        indent_xml(root)
-                        # Escribir el XML procesado en el archivo de destino
-                        tree.write(ruta_destino_archivo, encoding='utf-8', xml_declaration=True)
-                    except ParseError as e_parse:
-                        msg = f"Error de formato XML en '{ruta_origen}', no se pudo procesar. Copiando tal cual. Error: {e_parse}"
-                        self.log.emit(msg)
-                        self.error_log.emit(msg)
-                        # Si falla el parseo, es más seguro copiar el archivo original
-                        shutil.copy2(ruta_origen, ruta_destino_archivo)
-                    except Exception as e_process:
-                        msg = f"Error procesando '{ruta_origen}': {e_process}"
-                        self.log.emit(msg)
-                        self.error_log.emit(msg)
-                else:
-                    shutil.copy2(ruta_origen, ruta_destino_archivo)
-                
-                # Incrementar contadores de forma thread-safe
-                with self._lock:
-                    self.archivos_copiados += 1
-                    archivos_actual = self.archivos_copiados
-                archivos_procesados_local += 1
-                # Emitir señal para actualizar contador en UI
-                self.archivos_count.emit(archivos_actual)
-
-            # Actualizar progreso de forma thread-safe
-            with self._lock:
-                self._mods_procesados_count += 1
-                progreso_general = int((self._mods_procesados_count / total_mods) * 100)
-                count_actual = self._mods_procesados_count
-            
-            self.log.emit(f"--- Mod procesado '{mod}' ---")
-            self.progreso.emit(progreso_general)
-            self.mods_count.emit(count_actual, total_mods)
-            
-        except Exception as e:
-            # Error específico del mod, registrar pero no detener otros threads
-            import traceback
-            msg = f"Error procesando mod '{mod}': {str(e)}"
-            self.log.emit(msg)
-            self.error_log.emit(f"{msg}\n{traceback.format_exc()}")
-            # Actualizar contador incluso si falló
-            with self._lock:
-                self._mods_procesados_count += 1
-                progreso_general = int((self._mods_procesados_count / total_mods) * 100)
-            self.progreso.emit(progreso_general)
+    def _listar_tareas_mod(self, mod):
+        """Genera las tareas (una por archivo XML) de un mod para _procesar_archivo."""
+        ruta_mod = os.path.join(self.origen, mod)
+        ruta_idioma = os.path.join(ruta_mod, self.nombre_subcarpeta)
+
+        tareas = []
+        ruta_destino_base = os.path.join(self.destino, self.nombre_destino)
+        prefijo = f"[{mod}]_"
+        # Recorrido con os.scandir y una pila: DirEntry ya trae el tipo y la ruta unida, sin stat extra.
+        # Cada carpeta va con su carpeta de destino, que se arma concatenando en lugar de relpath/join.
+        carpetas_pendientes = [(ruta_idioma, ruta_destino_base)]
+        while carpetas_pendientes:
+            carpeta_raiz, ruta_destino_carpeta = carpetas_pendientes.pop()
+            try:
+                with os.scandir(carpeta_raiz) as it:
+                    entradas = list(it)
+            except OSError:
+                continue # Ignorar carpetas a las que no se puede acceder
+            destino_sep = ruta_destino_carpeta + os.sep
+            for entrada in entradas:
+                if entrada.is_dir(follow_symlinks=False):
+                    carpetas_pendientes.append((entrada.path, destino_sep + entrada.name))
+                elif entrada.name.endswith(".xml") and entrada.is_file():
+                    if ruta_destino_carpeta not in self._carpetas_creadas:
+                        os.makedirs(ruta_destino_carpeta, exist_ok=True)
+                        self._carpetas_creadas.add(ruta_destino_carpeta)
+                    # Ya sabemos que termina en ".xml": [mod]_nombre.xml sin pasar por splitext
+                    ruta_destino_archivo = destino_sep + prefijo + entrada.name
+                    tareas.append((mod, entrada.path, ruta_destino_archivo, self.eliminar_comentarios))
+        return tareas
+
+    def _marcar_mod_procesado(self, total_mods):
+        """Actualiza el contador de mods y emite el progreso general."""
+        self._mods_procesados_count += 1
+        progreso_general = int((self._mods_procesados_count / total_mods) * 100)
+        self.progreso.emit(progreso_general)
+        self.mods_count.emit(self._mods_procesados_count, total_mods)
 
 class CompresorThread(QThread):
     log = Signal(str)
@@ -289,12 +552,21 @@ class CompresorThread(QThread):
             nombre_archivo_salida = os.path.join(self.ruta_base, self.carpeta_a_comprimir)
             self.log.emit(f"Iniciando compresión de '{self.carpeta_a_comprimir}'...")
             
-            archivo_comprimido = shutil.make_archive(
-                base_name=nombre_archivo_salida,
-                format='tar',
-                root_dir=self.ruta_base,
-                base_dir=self.carpeta_a_comprimir
-            )
+            if zstd is not None:
+                # tar en streaming comprimido con zstd (nivel 3, todos los núcleos) directamente al disco
+                archivo_comprimido = nombre_archivo_salida + '.tar.zst'
+                compresor = zstd.ZstdCompressor(level=3, threads=-1)
+                with open(archivo_comprimido, 'wb') as salida, \
+                        compresor.stream_writer(salida) as flujo, \
+                        tarfile.open(fileobj=flujo, mode='w|') as tar:
+                    tar.copybufsize = _BUFFER_ESCRITURA
+                    _agregar_arbol_tar(tar, ruta_carpeta_origen, self.carpeta_a_comprimir, False)
+            else:
+                archivo_comprimido = nombre_archivo_salida + '.tar'
+                with tarfile.open(archivo_comprimido, 'w') as tar:
+                    tar.copybufsize = _BUFFER_ESCRITURA
+                    _agregar_arbol_tar(tar, ruta_carpeta_origen, self.carpeta_a_comprimir,
+                                       hasattr(os, 'sendfile'))
             self.log.emit(f"Compresión completada. Archivo creado: {archivo_comprimido}")
 
             # Eliminar la carpeta original después de comprimir
@@ -314,6 +586,46 @@ class CompresorThread(QThread):
             self.error_log.emit(error_msg)
             self.terminado.emit(False, error_msg)
 
+class DetectarIdiomasWorker(QThread):
+    """Busca en segundo plano las carpetas de idioma de los mods de `origen` y cuenta sus XML."""
+    log = Signal(str)
+    resultado = Signal(str, object, int) # origen, set de idiomas, total de archivos XML
+    error = Signal(str, str) # origen, mensaje
+
+    def __init__(self, origen, parent=None):
+        super().__init__(parent)
+        self.origen = origen
+
+    def run(self):
+        origen = self.origen
+        idiomas_encontrados = set()
+        total_xml_files = 0
+
+        try:
+            # os.scandir ya trae el tipo de cada entrada: sin un isdir (stat) extra por carpeta
+            # y DirEntry.path ya es la ruta unida, sin os.path.join
+            with os.scandir(origen) as it:
+                rutas_mods = [e.path for e in it if e.is_dir()]
+            if not rutas_mods:
+                self.log.emit("No se encontraron carpetas de mods en el origen.")
+                self.resultado.emit(origen, idiomas_encontrados, 0)
+                return
+
+            for ruta_mod in rutas_mods:
+                try:
+                    with os.scandir(ruta_mod) as it:
+                        for entrada in it:
+                            subfolder = entrada.name
+                            if entrada.is_dir() and subfolder.lower() not in _CARPETAS_A_IGNORAR:
+                                idiomas_encontrados.add(subfolder)
+                                total_xml_files += _contar_xml(entrada.path)
+                except OSError:
+                    continue # Ignorar si no se puede acceder
+
+            self.resultado.emit(origen, idiomas_encontrados, total_xml_files)
+        except Exception as e:
+            self.error.emit(origen, str(e))
+
 class DialogoPersonalizarReporte(QDialog):
     def __init__(self, config, sample_mods, parent=None):
         super().__init__(parent)
@@ -321,6 +633,8 @@ class DialogoPersonalizarReporte(QDialog):
         self.setMinimumSize(810, 500)
         self.config = config.copy()
         self.sample_mods = sample_mods
+        # La lista de mods no cambia mientras el diálogo está abierto: se ordena una sola vez
+        self._sorted_mods = sorted(sample_mods)
 
         # Layout principal horizontal
         main_layout = QHBoxLayout(self)
@@ -386,13 +700,22 @@ class DialogoPersonalizarReporte(QDialog):
         main_layout.addWidget(preview_widget, 1) # Stretch factor
 
         # --- Conexiones para la vista previa en vivo ---
-        self.txt_titulo.textChanged.connect(self.actualizar_preview)
-        self.chk_incluir_conteo.toggled.connect(self.actualizar_preview)
-        self.chk_incluir_lista_mods.toggled.connect(self.actualizar_preview)
-        self.txt_texto_adicional.textChanged.connect(self.actualizar_preview)
+        # Los cambios se agrupan: la vista previa se regenera 150 ms después del último cambio
+        self.timer_preview = QTimer(self)
+        self.timer_preview.setSingleShot(True)
+        self.timer_preview.setInterval(150)
+        self.timer_preview.timeout.connect(self.actualizar_preview)
+        self.txt_titulo.textChanged.connect(self.programar_preview)
+        self.chk_incluir_conteo.toggled.connect(self.programar_preview)
+        self.chk_incluir_lista_mods.toggled.connect(self.programar_preview)
+        self.txt_texto_adicional.textChanged.connect(self.programar_preview)
 
         self.actualizar_preview()
 
+    def programar_preview(self, *args):
+        # Reinicia la espera en cada cambio (tecla, casilla...)
+        self.timer_preview.start()
+
     def actualizar_preview(self):
         titulo = self.txt_titulo.text()
         incluir_conteo = self.chk_incluir_conteo.isChecked()
@@ -408,9 +731,9 @@ class DialogoPersonalizarReporte(QDialog):
         if incluir_conteo:
             preview_content.append(f"Total de mods encontrados: {len(self.sample_mods)}\n")
         if incluir_lista:
-            if self.sample_mods:
+            if self._sorted_mods:
                 preview_content.append("Lista de mods:")
-                for mod in sorted(self.sample_mods):
+                for mod in self._sorted_mods:
                     preview_content.append(f"- {mod}")
             else:
                 preview_content.append("Lista de mods:\n(No hay mods procesados para mostrar en la vista previa)")
@@ -442,10 +765,24 @@ class VentanaPrincipal(QMainWindow):
         self.destino = ""
         self.idioma_seleccionado = ""
         self.compresor_hilo = None
+        self.detector_hilo = None
+        # La detección de idiomas solo se repite si el origen cambió o el sistema de archivos avisó
+        # de cambios en él (QFileSystemWatcher), o si el usuario pulsa "Detectar Idiomas"
+        self._idiomas_dirty = True
+        self._origen_detectado = None
+        self._fs_watcher = QFileSystemWatcher(self)
+        self._fs_watcher.directoryChanged.connect(self.marcar_idiomas_dirty)
         self.mods_procesados_en_ultimo_run = []
         self.opciones_default = {}
         self.reporte_config = {}
         self.hilo = None
+        # Último contenido escrito en el archivo de configuración, para no reescribirlo si no cambió
+        self._last_config_blob = None
+        # Hora "HH:MM:SS" del último segundo formateado para el log (ver _hora_log)
+        self._last_sec = None
+        self._last_sec_str = ""
+        # packageId ya leídos de About.xml: ruta -> (st_mtime_ns, packageId o None)
+        self._pkg_id_cache = {}
         self.cargar_configuracion()
         self.init_ui()
         self.post_init_setup()
@@ -485,7 +822,7 @@ class VentanaPrincipal(QMainWindow):
         self.cmb_idioma.setPlaceholderText("Detecta o escribe el nombre de la carpeta de idioma...")
         self.cmb_idioma.setEnabled(False)
         btn_detectar = QPushButton("Detectar Idiomas")
-        btn_detectar.clicked.connect(self.detectar_idiomas)
+        btn_detectar.clicked.connect(lambda: self.detectar_idiomas(forzar=True))
         h_idioma.addWidget(lbl_idioma)
         h_idioma.addWidget(self.cmb_idioma, 1)
         h_idioma.addWidget(btn_detectar)
@@ -504,7 +841,8 @@ class VentanaPrincipal(QMainWindow):
         self.chk_comprimir = QCheckBox("Comprimir resultado en un archivo .tar al finalizar")
         self.chk_comprimir.setToolTip(
             "Si se marca, después de copiar todos los archivos, creará un archivo .tar con la\n"
-            "carpeta de idioma resultante y luego eliminará la carpeta original."
+            "carpeta de idioma resultante y luego eliminará la carpeta original.\n"
+            "Si el paquete zstandard está instalado, el archivo se comprime como .tar.zst."
         )
         self.chk_update_about = QCheckBox("Actualizar About.xml (forceLoadAfter)")
         self.chk_update_about.setToolTip(
@@ -530,6 +868,19 @@ class VentanaPrincipal(QMainWindow):
         h_accion.addWidget(self.btn_reporte)
         h_accion.addWidget(self.btn_procesar)
         main_layout.addLayout(h_accion)
+        # Refresco periódico del contador de archivos mientras el hilo de copia trabaja,
+        # en lugar de una señal por cada archivo copiado
+        self.timer_contador = QTimer(self)
+        self.timer_contador.setInterval(200)
+        self.timer_contador.timeout.connect(self.actualizar_contador_archivos)
+        # Los mensajes de log se acumulan y se vuelcan juntos cada 50 ms: un solo append (y un solo
+        # reajuste del documento) por tanda en lugar de uno por mensaje
+        self._log_buf = []
+        self._log_errores_buf = []
+        self.timer_log = QTimer(self)
+        self.timer_log.setSingleShot(True)
+        self.timer_log.setInterval(50)
+        self.timer_log.timeout.connect(self.volcar_logs)
         self.progress = QProgressBar()
         self.progress.setValue(0)
         main_layout.addWidget(self.progress)
@@ -624,11 +975,8 @@ class VentanaPrincipal(QMainWindow):
     def guardar_estado_opciones(self):
         reply = QMessageBox.question(self, 'Guardar Opciones',
                                      "¿Desea guardar el estado actual de las casillas de verificación (Limpiar, Eliminar comentarios, Comprimir) como predeterminado para futuros usos?",
-                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
-        if reply == QMessageBox.StandardButton.Yes:
-            if not hasattr(self, 'opciones_default'):
-                self.opciones_default = {}
-
+                                     _YES_NO, _NO)
+        if reply == _YES:
             self.opciones_default['limpiar_destino'] = self.chk_limpiar_destino.isChecked()
             self.opciones_default['eliminar_comentarios'] = self.chk_eliminar_comentarios.isChecked()
             self.opciones_default['comprimir'] = self.chk_comprimir.isChecked()
@@ -639,9 +987,10 @@ class VentanaPrincipal(QMainWindow):
             QMessageBox.information(self, "Opciones Guardadas", "El estado actual de las opciones se ha guardado como predeterminado.")
 
     def abrir_archivo_config(self):
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), CONFIG_FILE)
+        config_path = CONFIG_PATH
         try:
             if not os.path.exists(config_path):
+                self._last_config_blob = None # Forzar la escritura aunque el contenido no haya cambiado
                 self.guardar_configuracion()
                 self.logear(f"Archivo de configuración no encontrado, se ha creado uno nuevo en: {config_path}")
 
@@ -660,8 +1009,8 @@ class VentanaPrincipal(QMainWindow):
     def restablecer_rutas(self):
         reply = QMessageBox.question(self, 'Confirmar Restablecimiento',
                                      "¿Está seguro de que desea borrar las rutas de origen y destino guardadas?",
-                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
-        if reply == QMessageBox.StandardButton.Yes:
+                                     _YES_NO, _NO)
+        if reply == _YES:
             self.txt_origen.setText("")
             self.txt_destino.setText("")
             self.guardar_configuracion()
@@ -722,10 +1071,11 @@ class VentanaPrincipal(QMainWindow):
             self.reporte_config = default_report_config.copy()
             self.opciones_default = default_opciones.copy()
 
-            config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), CONFIG_FILE)
+            config_path = CONFIG_PATH
             if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    datos = json.load(f)
+                # Leer el archivo de una vez y parsear los bytes
+                with open(config_path, 'rb') as f:
+                    datos = _json_loads(f.read())
                     self.origen = datos.get('origen', '')
                     self.destino = datos.get('destino', '')
                     self.idioma_seleccionado = datos.get('idioma_seleccionado', '')
@@ -743,16 +1093,24 @@ class VentanaPrincipal(QMainWindow):
 
     def guardar_configuracion(self):
         try:
-            config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), CONFIG_FILE)
+            config_path = CONFIG_PATH
             config_data = {
                 'origen': self.txt_origen.text(),
                 'destino': self.txt_destino.text(),
                 'idioma_seleccionado': self.cmb_idioma.currentText(),
                 'reporte_config': self.reporte_config,
-                'opciones_default': getattr(self, 'opciones_default', {})
+                'opciones_default': self.opciones_default
             }
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, ensure_ascii=False, indent=2)
+            # Serializar primero y escribir de una vez: json.dump haría una escritura por cada token
+            blob = json.dumps(config_data, ensure_ascii=False, indent=2).encode('utf-8')
+            if blob == self._last_config_blob:
+                return # Nada cambió desde la última vez que se guardó
+            # Escribir en un temporal y reemplazar: el archivo nunca queda a medio escribir
+            tmp_path = config_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, config_path)
+            self._last_config_blob = blob
         except IOError as e:
             self.logear_error(f"No se pudo guardar la configuración: {e}")
 
@@ -773,7 +1131,7 @@ class VentanaPrincipal(QMainWindow):
 
     def iniciar_proceso(self):
         # Prevenir múltiples ejecuciones simultáneas
-        if hasattr(self, 'hilo') and self.hilo is not None and self.hilo.isRunning():
+        if self.hilo is not None and self.hilo.isRunning():
             QMessageBox.warning(self, "Advertencia", "Ya hay un proceso en ejecución. Por favor, espera a que termine.")
             return
 
@@ -815,13 +1173,15 @@ class VentanaPrincipal(QMainWindow):
             if os.path.isdir(ruta_a_borrar):
                 reply = QMessageBox.question(self, 'Confirmar Limpieza',
                                              f"¿Está seguro de que desea eliminar permanentemente la carpeta y todo su contenido?\n\n{ruta_a_borrar}",
-                                             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
-                if reply == QMessageBox.StandardButton.No:
+                                             _YES_NO, _NO)
+                if reply == _NO:
                     self.logear("Proceso cancelado por el usuario.")
                     return
 
         self.txt_log.clear()
         self.txt_log_errores.clear()
+        self._log_buf.clear()
+        self._log_errores_buf.clear()
         self.mods_procesados_en_ultimo_run = []
         self.btn_reporte.setEnabled(False)
         self.errores_widget.hide()
@@ -835,32 +1195,61 @@ class VentanaPrincipal(QMainWindow):
         self.hilo.error_log.connect(self.logear_error)
         self.hilo.terminado.connect(self.proceso_terminado)
         self.hilo.mods_count.connect(self.actualizar_contador_mods)
-        self.hilo.archivos_count.connect(self.actualizar_contador_archivos)
         self.hilo.start()
+        self.timer_contador.start()
+
+    def _hora_log(self):
+        """Hora actual para el log; solo se vuelve a formatear cuando cambia el segundo."""
+        t = int(time.time())
+        if t != self._last_sec:
+            self._last_sec_str = time.strftime("%H:%M:%S", time.localtime(t))
+            self._last_sec = t
+        return self._last_sec_str
 
     def logear(self, mensaje):
-        hora = datetime.now().strftime("%H:%M:%S")
-        self.txt_log.append(f"[{hora}] {mensaje}")
+        hora = self._hora_log()
+        # Todo el log se vuelca como HTML: el texto normal se escapa
+        mensaje = escape(mensaje).replace("\n", "<br>")
+        self._log_buf.append(f"[{hora}] {mensaje}")
+        self.programar_volcado_logs()
 
     def logear_error(self, mensaje):
         if self.errores_widget.isHidden():
             self.errores_widget.show()
-        hora = datetime.now().strftime("%H:%M:%S")
-        # Agregar texto en rojo usando HTML
-        self.txt_log_errores.append(f"<span style='color: #CE9178;'>[{hora}] {mensaje}</span>")
+        hora = self._hora_log()
+        # Agregar texto en rojo usando HTML (los mensajes pueden traer varias líneas)
+        mensaje = mensaje.replace("\n", "<br>")
+        self._log_errores_buf.append(f"<span style='color: #CE9178;'>[{hora}] {mensaje}</span>")
+        self.programar_volcado_logs()
 
     def logear_azul(self, mensaje):
-        hora = datetime.now().strftime("%H:%M:%S")
-        self.txt_log.append(f"<span style='color: #569CD6;'>[{hora}] {mensaje}</span>")
-
-    def actualizar_contador_archivos(self, cantidad):
-        """Actualiza el contador de archivos copiados en la UI en tiempo real."""
-        self.lbl_contador.setText(f"Archivos copiados: {cantidad}")
+        hora = self._hora_log()
+        self._log_buf.append(f"<span style='color: #569CD6;'>[{hora}] {mensaje}</span>")
+        self.programar_volcado_logs()
+
+    def programar_volcado_logs(self):
+        if not self.timer_log.isActive():
+            self.timer_log.start()
+
+    def volcar_logs(self):
+        """Añade de una vez a los registros todos los mensajes acumulados desde el último volcado."""
+        if self._log_buf:
+            self.txt_log.append("<span style='white-space: pre-wrap;'>" + "<br>".join(self._log_buf) + "</span>")
+            self._log_buf.clear()
+        if self._log_errores_buf:
+            self.txt_log_errores.append("<br>".join(self._log_errores_buf))
+            self._log_errores_buf.clear()
+
+    def actualizar_contador_archivos(self):
+        """Actualiza el contador de archivos copiados en la UI (llamado periódicamente por timer_contador)."""
+        if self.hilo is not None:
+            self.lbl_contador.setText(f"Archivos copiados: {self.hilo.archivos_copiados}")
 
     def actualizar_contador_mods(self, procesados, total):
         self.lbl_contador_mods.setText(f"Mods procesados: {procesados}/{total}")
 
     def proceso_terminado(self, cantidad):
+        self.timer_contador.stop()
         self.lbl_contador.setText(f"Archivos copiados: {cantidad}")
         self.progress.setValue(100)
         # Verificar que self.hilo no sea None antes de acceder a sus atributos
@@ -910,7 +1299,7 @@ class VentanaPrincipal(QMainWindow):
         cantidad_copiados = self.hilo.archivos_copiados if self.hilo is not None else 0
         if exito:
             msg_final = (f"Se han copiado {cantidad_copiados} archivos correctamente.\n\n"
-                         f"El archivo .tar ha sido creado exitosamente en:\n{mensaje}")
+                         f"El archivo comprimido ha sido creado exitosamente en:\n{mensaje}")
             QMessageBox.information(self, "Proceso Completado", msg_final)
         else:
             msg_final = (f"Se han copiado {cantidad_copiados} archivos correctamente, "
@@ -980,57 +1369,69 @@ class VentanaPrincipal(QMainWindow):
             self.logear_error(error_msg)
             QMessageBox.critical(self, "Error de Reporte", error_msg)
 
-    def detectar_idiomas(self):
+    def marcar_idiomas_dirty(self, ruta=None):
+        self._idiomas_dirty = True
+
+    def detectar_idiomas(self, forzar=False):
         origen = self.txt_origen.text()
         if not origen or not os.path.isdir(origen):
             self.cmb_idioma.clear()
             self.cmb_idioma.setEnabled(False)
             return
+        if not forzar and not self._idiomas_dirty and origen == self._origen_detectado:
+            return # Nada cambió desde la última detección
+
+        # Vigilar la carpeta de origen para saber cuándo hace falta volver a detectar
+        if origen != self._origen_detectado:
+            directorios = self._fs_watcher.directories()
+            if directorios:
+                self._fs_watcher.removePaths(directorios)
+            self._fs_watcher.addPath(origen)
+        self._origen_detectado = origen
+        self._idiomas_dirty = False
 
         self.logear("Detectando posibles carpetas de idioma...")
-        idiomas_encontrados = set()
-        total_xml_files = 0
-        # Carpetas a ignorar que comúnmente no son de idiomas
-        carpetas_a_ignorar = {'about', 'defs', 'assemblies', 'patches', 'textures', 'sounds', 'common', 'ideasshared', 'licenses', 'source', 'src', 'docs', 'examples', '.git', '.vs', '1.0', '1.1', '1.2', '1.3', '1.4', '1.5'}
-
-        try:
-            mod_folders = [d for d in os.listdir(origen) if os.path.isdir(os.path.join(origen, d))]
-            if not mod_folders:
-                self.logear("No se encontraron carpetas de mods en el origen.")
-                return
-
-            for mod_folder in mod_folders:
-                ruta_mod = os.path.join(origen, mod_folder)
-                try:
-                    for subfolder in os.listdir(ruta_mod):
-                        ruta_subfolder = os.path.join(ruta_mod, subfolder)
-                        if os.path.isdir(ruta_subfolder) and subfolder.lower() not in carpetas_a_ignorar:
-                            idiomas_encontrados.add(subfolder)
-                            for _, _, archivos in os.walk(ruta_subfolder):
-                                total_xml_files += sum(1 for archivo in archivos if archivo.endswith(".xml"))
-                except OSError:
-                    continue # Ignorar si no se puede acceder
+        self.cmb_idioma.setEnabled(False)
+        self.cmb_idioma.setPlaceholderText("Detectando idiomas...")
+        # El recorrido de carpetas se hace en segundo plano para no congelar la ventana.
+        # Con la ventana como padre, Qt mantiene vivo el hilo hasta que termina.
+        self.detector_hilo = DetectarIdiomasWorker(origen, self)
+        self.detector_hilo.log.connect(self.logear)
+        self.detector_hilo.resultado.connect(self.mostrar_idiomas_detectados)
+        self.detector_hilo.error.connect(self.mostrar_error_deteccion)
+        self.detector_hilo.finished.connect(self.detector_hilo.deleteLater)
+        self.detector_hilo.start()
+
+    def mostrar_idiomas_detectados(self, origen, idiomas_encontrados, total_xml_files):
+        # Ignorar resultados de una detección anterior si el origen cambió mientras tanto
+        if origen != self.txt_origen.text():
+            return
+        self.cmb_idioma.setPlaceholderText("Detecta o escribe el nombre de la carpeta de idioma...")
+        self.cmb_idioma.clear()
+        if idiomas_encontrados:
+            sorted_idiomas = sorted(list(idiomas_encontrados))
+            self.cmb_idioma.addItems(sorted_idiomas)
+            self.cmb_idioma.setEnabled(True)
+            self.logear(f"Carpetas detectadas: {len(sorted_idiomas)}, con {total_xml_files} archivos XML. Por favor, selecciona el idioma a procesar.")
+            if self.idioma_seleccionado and self.idioma_seleccionado in sorted_idiomas:
+                self.cmb_idioma.setCurrentText(self.idioma_seleccionado)
+        else:
+            self.logear("No se detectaron carpetas que parezcan ser de idioma.")
+            self.cmb_idioma.setEnabled(False)
 
-            self.cmb_idioma.clear()
-            if idiomas_encontrados:
-                sorted_idiomas = sorted(list(idiomas_encontrados))
-                self.cmb_idioma.addItems(sorted_idiomas)
-                self.cmb_idioma.setEnabled(True)
-                self.logear(f"Carpetas detectadas: {len(sorted_idiomas)}, con {total_xml_files} archivos XML. Por favor, selecciona el idioma a procesar.")
-                if self.idioma_seleccionado and self.idioma_seleccionado in sorted_idiomas:
-                    self.cmb_idioma.setCurrentText(self.idioma_seleccionado)
-            else:
-                self.logear("No se detectaron carpetas que parezcan ser de idioma.")
-                self.cmb_idioma.setEnabled(False)
-        except Exception as e:
-            self.logear_error(f"Error al detectar idiomas: {e}")
+    def mostrar_error_deteccion(self, origen, mensaje):
+        if origen != self.txt_origen.text():
+            return
+        self._idiomas_dirty = True # Reintentar en la próxima detección
+        self.cmb_idioma.setPlaceholderText("Detecta o escribe el nombre de la carpeta de idioma...")
+        self.cmb_idioma.setEnabled(self.cmb_idioma.count() > 0)
+        self.logear_error(f"Error al detectar idiomas: {mensaje}")
 
     def aplicar_opciones_default(self):
-        if hasattr(self, 'opciones_default'):
-            self.chk_limpiar_destino.setChecked(self.opciones_default.get('limpiar_destino', False))
-            self.chk_eliminar_comentarios.setChecked(self.opciones_default.get('eliminar_comentarios', False))
-            self.chk_comprimir.setChecked(self.opciones_default.get('comprimir', False))
-            self.chk_update_about.setChecked(self.opciones_default.get('update_about', False))
+        self.chk_limpiar_destino.setChecked(self.opciones_default.get('limpiar_destino', False))
+        self.chk_eliminar_comentarios.setChecked(self.opciones_default.get('eliminar_comentarios', False))
+        self.chk_comprimir.setChecked(self.opciones_default.get('comprimir', False))
+        self.chk_update_about.setChecked(self.opciones_default.get('update_about', False))
 
     def mostrar_acerca_de(self):
         QMessageBox.information(self, "Acerca de",
@@ -1063,48 +1464,69 @@ class VentanaPrincipal(QMainWindow):
         self.logear(f"Actualizando lista de mods en: {ruta_about}")
         
         try:
-            # Parsear about.xml
-            tree = ET.parse(ruta_about)
+            # Recopilar IDs
+            origen = self.txt_origen.text()
+            ids_mods = set() # Sin duplicados desde el principio
+            
+            # Leer los packageId de todos los mods a la vez: cada uno es un About.xml pequeño,
+            # casi todo E/S, así que los threads solapan la espera del disco
+            rutas_mods = [os.path.join(origen, mod_name) for mod_name in self.mods_procesados_en_ultimo_run]
+            with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+                package_ids = list(executor.map(self.obtener_package_id, rutas_mods))
+                published_ids = list(executor.map(_tiene_published_id, rutas_mods))
+
+            for mod_name, pid, has_published_id in zip(self.mods_procesados_en_ultimo_run, package_ids, published_ids):
+                if not pid or not has_published_id:
+                    self.logear_azul(f"Faltan metadatos en: {mod_name}")
+                else:
+                    ids_mods.add(pid)
+            
+            # Ordenar
+            ids_mods = sorted(ids_mods)
+
+            with open(ruta_about, 'rb') as f:
+                datos = f.read()
+
+            # Caso habitual: ya existe <forceLoadAfter>. Solo se reemplaza ese bloque sobre los bytes,
+            # sin parsear ni re-serializar el resto del archivo
+            m = _FORCE_LOAD_RE.search(datos)
+            if m is not None:
+                ids_actuales = sorted(li.strip().decode('utf-8') for li in _LI_RE.findall(m.group()))
+                if ids_mods == ids_actuales:
+                    self.logear("About.xml ya está actualizado, no hace falta reescribirlo.")
+                    return
+                with open(ruta_about, 'wb') as f:
+                    f.write(datos[:m.start()] + _bloque_force_load(datos, m.start(), ids_mods) + datos[m.end():])
+                self.logear(f"About.xml actualizado correctamente con {len(ids_mods)} entradas.")
+                return
+
+            # Sin <forceLoadAfter> (o con una forma que el patrón no reconoce): hacerlo con ElementTree
+            tree = ET.parse(io.BytesIO(datos))
             root = tree.getroot()
             
             # Buscar forceLoadAfter
             force_load = root.find('forceLoadAfter')
             if force_load is None:
+                ids_actuales = None
                 force_load = ET.SubElement(root, 'forceLoadAfter')
+            else:
+                # Lista actual, para no reescribir el archivo si no va a cambiar
+                ids_actuales = sorted((li.text or '').strip() for li in force_load.findall('li'))
+            if ids_mods == ids_actuales:
+                self.logear("About.xml ya está actualizado, no hace falta reescribirlo.")
+                return
             
             # Limpiar lista actual
             force_load.clear()
             
-            # Recopilar IDs
-            origen = self.txt_origen.text()
-            ids_mods = []
-            
-            for mod_name in self.mods_procesados_en_ultimo_run:
-                ruta_mod = os.path.join(origen, mod_name)
-                pid = self.obtener_package_id(ruta_mod)
-                
-                # Verificar si existe PublishedFileId.txt
-                has_published_id = False
-                for p in [os.path.join(ruta_mod, "PublishedFileId.txt"), os.path.join(ruta_mod, "About", "PublishedFileId.txt")]:
-                    if os.path.isfile(p):
-                        has_published_id = True
-                        break
-                
-                if not pid or not has_published_id:
-                    self.logear_azul(f"Faltan metadatos en: {mod_name}")
-                else:
-                    ids_mods.append(pid)
-            
-            # Ordenar y eliminar duplicados
-            ids_mods = sorted(list(set(ids_mods)))
-            
             # Rellenar forceLoadAfter
             for pid in ids_mods:
                 li = ET.SubElement(force_load, 'li')
                 li.text = pid
             
-            # Re-indentar para que quede bonito
-            indent_xml(root)
+            # Re-indentar para que quede bonito (y terminar el archivo con un salto de línea)
+            ET.indent(root, space="  ")
+            root.tail = "\n"
             
             tree.write(ruta_about, encoding='utf-8', xml_declaration=True)
             self.logear(f"About.xml actualizado correctamente con {len(ids_mods)} entradas.")
@@ -1126,11 +1548,20 @@ class VentanaPrincipal(QMainWindow):
         for nombre in candidatos:
             ruta = os.path.join(ruta_mod, "About", nombre)
             try:
-                tree = ET.parse(ruta)
-                root = tree.getroot()
-                pid = root.find("packageId")
-                if pid is not None and pid.text:
-                    return pid.text.strip().lower()
+                # Si el archivo no cambió desde la última lectura, reutilizar el resultado sin parsear
+                mtime = os.stat(ruta).st_mtime_ns
+                cached = self._pkg_id_cache.get(ruta)
+                if cached is not None and cached[0] == mtime:
+                    if cached[1]:
+                        return cached[1]
+                    continue
+                valor = None
+                try:
+                    valor = _leer_package_id(ruta)
+                finally:
+                    self._pkg_id_cache[ruta] = (mtime, valor)
+                if valor:
+                    return valor
             except:
                 continue
         return None
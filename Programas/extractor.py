@@ -2,362 +2,746 @@ import sys
 import os
 import shutil
 import json
+import io
 import re
+import threading
 import xml.etree.ElementTree as ET
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
-from xml.sax.saxutils import escape
+try:
+    # lxml (libxml2) es opcional: si está instalado acelera mucho el parseo de XML
+    from lxml import etree as LET
+except ImportError:
+    LET = None
+try:
+    # pyahocorasick es opcional: busca todas las etiquetas de una lista en una sola pasada por el tag
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                              QTextEdit, QFileDialog, QMessageBox, QToolButton, QMenu, QComboBox)
 from PySide6.QtGui import QAction, QDesktopServices
-from PySide6.QtCore import Qt, QUrl
-
-class RimWorldTranslatorGUI(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("RimWorld Translation Extractor")
-        self.setMinimumSize(600, 400)
-
-        # Archivo de configuración en el directorio del script (Desktop)
-        self.config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extractor_config.json")
-
-        # Etiquetas que normalmente queremos traducir
-        self.translatable_tags = [
-            'label', 'description', 'jobString', 'reportString', 'pawnLabel', 
-            'graphLabel', 'verb', 'gerund', 'deathMessage', 'skillLabel', 
-            'labelNoun', 'labelShort', 'labelPlural', 'adjective', 'text', 
-            'rejectionMessage', 'helpText', 'labelShortAdj', 'flavorText',
-            'title', 'titleShort', 'baseDesc', 'titleFemale', 'titleShortFemale',
-            'letterLabel', 'letterText', 'extraOutcomeDesc',
-            'customLabel', 'chargeNoun', 'endMessage'
-        ]
-
-        # Etiquetas técnicas a excluir (blacklist)
-        self.blacklisted_tags = [
-            'verbClass', 'commandTexture', 'commandLabelKey', 'texPath', 'iconPath'
-        ]
-
-        self.init_ui()
-        self.load_config()
-
-    def init_ui(self):
-        central_widget = QWidget()
-        self.setCentralWidget(central_widget)
-        main_layout = QHBoxLayout(central_widget)
+from PySide6.QtCore import Qt, QUrl, QThread, QTimer, Signal
+
+# Carpetas de versión (1.4, 1.5...) al inicio de una ruta relativa
+_VERSION_RE = re.compile(r'^\d+\.\d+$')
+# Caracteres que no pueden ir en el nombre de un <li> (todo salvo alfanuméricos, '_' y '-')
+_SANITIZE_RE = re.compile(r'[^\w\-]')
+# Carpetas de un mod que no hace falta recorrer al buscar Defs y Keyed (en minúsculas):
+# código, recursos gráficos y de sonido (suelen ser los árboles más grandes) y la propia salida
+_CARPETAS_IGNORADAS = frozenset({'.git', '__pycache__', 'source', 'assemblies', 'textures', 'sounds',
+                                 'plantillas traducciones'})
+# Equivale a xml.sax.saxutils.escape, pero en una sola pasada de str.translate
+_XML_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+@lru_cache(maxsize=16384)
+def _escape_cached(s):
+    """Escape XML memoizado: "TODO" y muchas traducciones se repiten."""
+    return s.translate(_XML_ESCAPE_TABLE)
+
+def _fast_escape(s):
+    """Escape XML que devuelve el mismo texto sin más si no tiene nada que escapar (lo habitual)."""
+    if '&' in s or '<' in s or '>' in s:
+        return _escape_cached(s)
+    return s
+
+# Orden de los campos dentro de cada Def en las plantillas (el resto va al final con 99)
+_FIELD_ORDER = {'label': 1, 'description': 2, 'title': 3, 'titleShort': 4, 'baseDesc': 5,
+                'deathMessage': 6, 'endMessage': 7}
+# Campos equivalentes que se prueban en el archivo cuando la clave exacta no tiene traducción
+_SUFFIX_SWAPS = {'baseDesc': 'description', 'description': 'baseDesc', 'title': 'label', 'label': 'title'}
+_BOMS_UTF16 = (b'\xff\xfe', b'\xfe\xff')
+_ERRORES_XML = (ET.ParseError,) if LET is None else (ET.ParseError, LET.XMLSyntaxError)
+# Parser de lxml que descarta comentarios e instrucciones, igual que ElementTree
+_PARSER_LXML = LET.XMLParser(remove_comments=True, remove_pis=True, huge_tree=True) if LET is not None else None
+
+def _parsear_xml(fuente):
+    """Parsea un XML completo (ruta en texto u objeto archivo), con lxml si está disponible."""
+    if LET is not None:
+        return LET.parse(fuente, _PARSER_LXML)
+    return ET.parse(fuente)
+
+def _needles(translatable_set):
+    """
+    Subcadenas (bytes en minúsculas) de las que un archivo de Defs necesita al menos una para
+    tener algo traducible: las etiquetas traducibles y rulesStrings.
+    Devuelve None si alguna etiqueta no es ASCII, porque bytes.lower() solo convierte ASCII.
+    """
+    tags = set(translatable_set)
+    tags.add('rulesstrings')
+    if not all(t.isascii() for t in tags):
+        return None
+    return tuple(t.encode('ascii') for t in tags)
+
+@lru_cache(maxsize=16)
+def _buscador(tags, exacta=False):
+    """
+    Devuelve una función que indica si un tag (ya en minúsculas) contiene como subcadena
+    alguna de las etiquetas del frozenset tags. Con pyahocorasick el autómata se construye
+    una vez por lista y cada consulta recorre el tag una sola vez, sea cual sea su tamaño.
+    Con exacta=True solo cuenta la coincidencia completa (una consulta al frozenset).
+    """
+    if exacta:
+        return tags.__contains__
+    if ahocorasick is not None and tags:
+        automata = ahocorasick.Automaton()
+        for t in tags:
+            automata.add_word(t, t)
+        automata.make_automaton()
+
+        def contiene(tag_lower):
+            for _ in automata.iter(tag_lower):
+                return True
+            return False
+        return contiene
+    return lambda tag_lower: any(t in tag_lower for t in tags)
+
+def _iter_hijos_raiz(ruta, recover=True):
+    """Recorre en streaming los hijos directos de la raíz de un XML y devuelve (tag, texto).
+    Cada hijo se libera en cuanto se ha leído, así nunca se construye el árbol completo.
+    Con recover=False un XML mal formado lanza el error también con lxml."""
+    if LET is not None:
+        eventos = LET.iterparse(str(ruta), events=('start', 'end'), remove_comments=True,
+                                remove_pis=True, recover=recover, huge_tree=True)
+    else:
+        eventos = ET.iterparse(ruta, events=('start', 'end'))
+    raiz = None
+    nivel = 0
+    for evento, elem in eventos:
+        if evento == 'start':
+            nivel += 1
+            if raiz is None:
+                raiz = elem
+            continue
+        nivel -= 1
+        if nivel == 1:
+            yield elem.tag, elem.text
+            elem.clear()
+            # Soltar los hermanos anteriores que ya se han leído
+            del raiz[:-1]
+    # Al terminar el archivo, liberar también lo que quede colgando de la raíz
+    if raiz is not None:
+        raiz.clear()
+
+# Estado de solo lectura de los procesos de extracción de Defs (lo fija _iniciar_proceso)
+_archive_translations = {}
+_english_translations = {}
+_recover_implicit = False
+_archive_by_def = {}
+# Carpetas de salida ya creadas por este proceso (para no repetir el makedirs en cada archivo)
+_created_dirs = set()
+
+def _discover(mod_path):
+    """
+    Recorre el mod una sola vez y devuelve (carpetas Defs, carpetas Keyed del inglés).
+    Las carpetas que nunca contienen Defs ni Keyed no se recorren.
+    """
+    defs_directories = []
+    keyed_directories = []
+    for root, dirs, files in os.walk(mod_path):
+        dirs[:] = [d for d in dirs if d.lower() not in _CARPETAS_IGNORADAS]
+        lower = os.path.basename(root).lower()
+        if lower == 'defs':
+            defs_directories.append(Path(root))
+        elif lower == 'keyed' and 'english' in os.path.basename(os.path.dirname(root)).lower():
+            keyed_directories.append(Path(root))
+    return defs_directories, keyed_directories
+
+def _ruta_destino(base, rel_path, carpeta):
+    """Une base/rel_path/carpeta como texto, sin el '.' de la raíz del mod."""
+    rel = os.fspath(rel_path)
+    if rel == ".":
+        return os.path.join(base, carpeta)
+    return os.path.join(base, rel, carpeta)
+
+def _has_defs_nearby(root, max_depth=3):
+    """
+    Indica si hay una carpeta 'Defs' bajo root, bajando como mucho max_depth niveles.
+    Termina en cuanto encuentra una, en lugar de recorrer todo el árbol.
+    """
+    stack = [(root, 0)]
+    while stack:
+        d, depth = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if e.is_dir(follow_symlinks=False):
+                        if e.name == 'Defs':
+                            return True
+                        if depth < max_depth:
+                            stack.append((e.path, depth + 1))
+        except OSError:
+            pass
+    return False
+
+def _iter_xml(path):
+    """
+    Recorre una carpeta con os.scandir y devuelve (ruta, nombre) de cada .xml, en el mismo
+    orden que os.walk: primero los archivos de cada carpeta y después sus subcarpetas.
+    DirEntry ya sabe si es carpeta por la propia lectura del directorio, sin un stat por entrada.
+    """
+    stack = [os.fspath(path)]
+    while stack:
+        d = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if e.is_dir(follow_symlinks=False):
+                        subdirs.append(e.path)
+                    elif e.name.endswith('.xml') and not e.is_dir():
+                        yield e.path, e.name
+        except OSError:
+            continue
+        stack.extend(reversed(subdirs))
+
+def _resolve_output(rel_path, target_version, merge_versions, simplify_mods):
+    """
+    Decide si una carpeta (ruta relativa al mod) se procesa con la versión elegida y en qué
+    ruta relativa se escriben sus plantillas. Devuelve (should_process, output_rel_path).
+    """
+    rel_str = str(rel_path)
+    output_rel_path = rel_path
+
+    if target_version != "Todas":
+        if merge_versions:
+            # Si combinamos, redirigimos todo a la versión destino
+            target_path = Path(target_version) if target_version != "Base" else Path(".")
+
+            # Lógica para reemplazar la versión origen con la destino en la ruta
+            parts = rel_path.parts
+            if rel_str == ".":
+                output_rel_path = target_path
+            elif _VERSION_RE.match(parts[0]):
+                output_rel_path = target_path.joinpath(*parts[1:])
+            else:
+                output_rel_path = target_path / rel_path
+        else:
+            is_base = rel_str == "."
+            if target_version == "Base" and not is_base: return False, rel_path
+            if target_version != "Base" and rel_str != target_version: return False, rel_path
+
+    if simplify_mods:
+        parts_out = list(output_rel_path.parts)
+        mods_idx = -1
+        for i, p in enumerate(parts_out):
+            if p.lower() == 'mods':
+                mods_idx = i
+                break
+        if mods_idx != -1 and len(parts_out) > mods_idx + 1:
+            del parts_out[mods_idx:mods_idx+2]
+            output_rel_path = Path(*parts_out) if parts_out else Path(".")
+
+    return True, output_rel_path
+
+def _iniciar_proceso(archive_translations, english_translations, recover_implicit):
+    """Inicializador de cada proceso del pool: recibe una sola vez las traducciones
+    del archivo y del inglés en lugar de serializarlas con cada tarea."""
+    global _archive_translations, _english_translations, _recover_implicit, _archive_by_def, _created_dirs
+    _archive_translations = archive_translations
+    _english_translations = english_translations
+    _recover_implicit = recover_implicit
+    # Índice inverso para recuperar las claves extra de cada Def sin recorrer todo el archivo
+    _archive_by_def = _indexar_por_def(archive_translations) if recover_implicit else {}
+    _created_dirs = set()
+
+def _indexar_por_def(translations):
+    """Agrupa las claves con punto por su Def ({def_name: [claves]}), en el orden del dict."""
+    por_def = {}
+    for arch_key in translations:
+        def_part, sep, _ = arch_key.partition('.')
+        if sep:
+            por_def.setdefault(def_part, []).append(arch_key)
+    return por_def
+
+def _process_file_worker(tarea):
+    """Procesa un archivo de Defs en un proceso aparte (ProcessPoolExecutor)."""
+    return process_file(*tarea)
+
+def _map_en_orden(executor, tareas, fn=_process_file_worker):
+    """
+    Ejecuta fn (por defecto process_file) sobre las tareas en el pool y devuelve sus resultados
+    en el mismo orden. El nombre del archivo es el segundo elemento de cada tarea.
+    Los archivos con el mismo nombre escriben en el mismo destino (y cada uno lee lo que dejó
+    el anterior), así que se reparten en tandas sucesivas para que nunca se procesen a la vez.
+    """
+    tandas = []
+    vistos = {}
+    for i, tarea in enumerate(tareas):
+        nombre = tarea[1].lower()
+        n = vistos.get(nombre, 0)
+        vistos[nombre] = n + 1
+        if n == len(tandas):
+            tandas.append([])
+        tandas[n].append(i)
+
+    resultados = [None] * len(tareas)
+    for tanda in tandas:
+        lote = [tareas[i] for i in tanda]
+        for i, res in zip(tanda, executor.map(fn, lote, chunksize=8)):
+            resultados[i] = res
+    return resultados
+
+def load_single_xml_translations(file_path):
+    # Un mismo XML del Archivo de Traducciones puede consultarse varias veces (p. ej. al
+    # combinar versiones): se memoriza por ruta y fecha de modificación para leerlo una sola vez
+    try:
+        mtime = os.stat(file_path).st_mtime_ns
+    except OSError:
+        return {}
+    return _load_single_xml_translations(os.fspath(file_path), mtime)
+
+@lru_cache(maxsize=256)
+def _load_single_xml_translations(file_path, mtime):
+    try:
+        return _leer_traducciones(file_path)
+    except Exception:
+        return {}
+
+def _leer_traducciones(file_path):
+    """
+    Lee en streaming un XML de traducciones y devuelve {clave: texto} sin los vacíos ni los TODO.
+    Los errores de lectura se propagan: cada llamador decide si los ignora o los avisa.
+    """
+    translations = {}
+    for tag, text in _iter_hijos_raiz(file_path):
+        if tag and text:
+            text = text.strip()
+            if text and text.upper() != "TODO":
+                translations[tag] = text
+    return translations
+
+# Búfer de salida reutilizado entre archivos, uno por hilo (los Keyed se guardan desde un pool de hilos)
+_buffers = threading.local()
+# Por encima de este tamaño el búfer se descarta tras usarlo, para no retener memoria de un archivo grande
+_BUF_MAX = 128 * 1024
+
+def _write_parts(path, parts):
+    """
+    Escribe los fragmentos de texto en path (UTF-8) de una sola vez, codificándolos en un
+    bytearray que se reutiliza de un archivo al siguiente. Los saltos de línea se convierten
+    a os.linesep, igual que al escribir en modo texto.
+    """
+    buf = getattr(_buffers, 'buf', None)
+    if buf is None:
+        buf = _buffers.buf = bytearray()
+    buf.clear()
+    for part in parts:
+        if os.linesep != '\n':
+            part = part.replace('\n', os.linesep)
+        buf += part.encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(buf)
+    if len(buf) > _BUF_MAX:
+        _buffers.buf = bytearray()
+
+def _read_existing_top_level(path):
+    """
+    Lee una plantilla ya generada y devuelve {etiqueta: texto} de los hijos directos con texto.
+    Se recorre en streaming y el dict solo se devuelve si el archivo se leyó completo:
+    si está mal formado lanza el error y el llamador decide qué hacer.
+    """
+    return {tag: text for tag, text in _iter_hijos_raiz(path, recover=False) if tag and text}
+
+def process_file(file_path, file_name, target_base_path, archive_base_path, translatable_set, blacklist_set, needles=None,
+                 strict_tag_match=False):
+    """
+    Extrae las cadenas traducibles de un archivo de Defs y escribe sus plantillas.
+    Es una función de módulo para poder ejecutarse en otro proceso: devuelve
+    (líneas_de_resultado, avisos) y el hilo principal se encarga de registrarlas.
+    """
+    avisos = []
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        avisos.append(f"Error al parsear: {file_name}")
+        return [], avisos
+
+    # Filtro previo: si el archivo no contiene ninguna etiqueta traducible (sonidos, parches,
+    # texturas...) no hace falta parsearlo. Los UTF-16 no se pueden buscar como bytes.
+    if needles is not None and not data.startswith(_BOMS_UTF16):
+        low = data.lower()
+        if not any(n in low for n in needles):
+            return [], avisos
+        del low
+
+    try:
+        tree = _parsear_xml(io.BytesIO(data))
+        del data
+        xml_root = tree.getroot()
+    except _ERRORES_XML:
+        avisos.append(f"Error al parsear: {file_name}")
+        return [], avisos
+
+    translations_by_type = {}
+    es_bloqueada = _buscador(blacklist_set, strict_tag_match)
+    es_traducible = _buscador(translatable_set, strict_tag_match)
+
+    for def_node in xml_root:
+        if not isinstance(def_node.tag, str): continue
         
-        # Layout izquierdo (controles principales)
-        left_layout = QVBoxLayout()
+        # Los mismos tipos de Def se repiten miles de veces: internarlos abarata las claves del dict
+        def_type = sys.intern(def_node.tag)
+        def_name_node = def_node.find('defName')
         
-        # Layout derecho (etiquetas editables)
-        right_layout = QVBoxLayout()
+        if def_name_node is None: continue
         
-        main_layout.addLayout(left_layout, stretch=3)
-        main_layout.addLayout(right_layout, stretch=1)
+        def_name = def_name_node.text
+        if not def_name: continue
         
-        layout = left_layout  # Mantener compatibilidad con el resto del código
+        if def_type not in translations_by_type:
+            translations_by_type[def_type] = []
+
+        # Iniciar búsqueda recursiva dentro del Def
+        extract_recursive(def_node, def_name, translations_by_type[def_type], es_traducible, es_bloqueada)
+        # Ya extraído: liberar el subárbol del Def antes de pasar al siguiente
+        def_node.clear()
+
+    # El árbol ya no hace falta mientras se escriben las plantillas
+    del tree, xml_root
+
+    if translations_by_type:
+        return save_translations(translations_by_type, file_name, target_base_path, archive_base_path, avisos), avisos
+    return [], avisos
+
+def _li_name(element):
+    """
+    Nombre base de un nodo <li>: su customLabel (prioridad para BodyParts) o, si no, su def.
+    Busca ambos en una sola pasada por los hijos en lugar de dos find().
+    """
+    custom_label = def_node = None
+    for c in element:
+        tag = c.tag
+        if tag == 'customLabel' and custom_label is None:
+            custom_label = c
+            if c.text:
+                # Sanitizar: espacios a guiones bajos, mantener solo caracteres seguros
+                return _SANITIZE_RE.sub('', c.text.strip().replace(' ', '_'))
+        elif tag == 'def' and def_node is None:
+            def_node = c
+    if def_node is not None and def_node.text:
+        return def_node.text.strip()
+    return None
+
+# Minúsculas de cada tag ya visto: el vocabulario de etiquetas de RimWorld es pequeño y se repite
+_lc_cache = {}
+
+def extract_recursive(node, current_path, results, es_traducible, es_bloqueada):
+    # es_traducible y es_bloqueada vienen de _buscador: reciben el tag en minúsculas
+    # Pre-calcular conteos para manejar duplicados
+    name_counts = defaultdict(int)
+    li_children_names = []
+    
+    for child in node:
+        if child.tag == 'li':
+            name = _li_name(child)
+            if name:
+                name_counts[name] += 1
+            li_children_names.append(name)
+        else:
+            li_children_names.append(None)
 
-        # Selección de carpeta del Mod
-        defs_layout = QHBoxLayout()
-        self.defs_input = QLineEdit()
-        self.defs_input.setPlaceholderText("Ruta de la carpeta del Mod")
+    name_indices = defaultdict(int)
+    li_index = 0
+    
+    for i, child in enumerate(node):
+        tag = child.tag
+        if not isinstance(tag, str) or tag == 'defName':
+            continue
         
-        # Auto-detectar si el script está dentro de la carpeta del mod
-        script_dir = os.path.dirname(os.path.abspath(__file__))
+        part = ""
+        if tag == 'li':
+            name = li_children_names[i]
+            if name:
+                # Si hay duplicados, usar sufijo numérico
+                if name_counts[name] > 1:
+                    idx = name_indices[name]
+                    part = f"{name}-{idx}"
+                    name_indices[name] = idx + 1
+                else:
+                    part = name
+            else:
+                # Usar índice numérico si no hay nombre
+                part = str(li_index)
+            li_index += 1
+        else:
+            part = tag
         
-        # Si encontramos 'Defs' en profundidad (estamos en un Mod)
-        if any("Defs" in dirs for _, dirs, _ in os.walk(script_dir)):
-            self.defs_input.setText(script_dir)
-
-        btn_browse = QPushButton("Buscar...")
-        btn_browse.clicked.connect(self.browse_mod)
-        btn_open_mod = QPushButton("Abrir")
-        btn_open_mod.clicked.connect(lambda: self.open_folder(self.defs_input.text()))
-        defs_layout.addWidget(QLabel("Carpeta del Mod:"))
-        defs_layout.addWidget(self.defs_input)
-        defs_layout.addWidget(btn_browse)
-        defs_layout.addWidget(btn_open_mod)
-        layout.addLayout(defs_layout)
-
-        # Selección de carpeta de Archivo de Traducciones (Repositorio)
-        archive_layout = QHBoxLayout()
-        self.archive_input = QLineEdit()
-        self.archive_input.setPlaceholderText("Ruta del Archivo de Traducciones (Opcional)")
-        btn_browse_archive = QPushButton("Buscar Archivo...")
-        btn_browse_archive.clicked.connect(self.browse_archive)
-        btn_open_archive = QPushButton("Abrir")
-        btn_open_archive.clicked.connect(lambda: self.open_folder(self.archive_input.text()))
-        archive_layout.addWidget(QLabel("Archivo Traducciones:"))
-        archive_layout.addWidget(self.archive_input)
-        archive_layout.addWidget(btn_browse_archive)
-        archive_layout.addWidget(btn_open_archive)
-        layout.addLayout(archive_layout)
-
-        # Nombre del lenguaje
-        lang_layout = QHBoxLayout()
-        self.lang_input = QLineEdit("SpanishLatin")
-        lang_layout.addWidget(QLabel("Lenguaje de salida:"))
-        lang_layout.addWidget(self.lang_input)
+        new_path = f"{current_path}.{part}"
         
-        self.version_combo = QComboBox()
-        self.version_combo.addItems(["Todas", "1.6", "1.5", "1.4", "1.3", "1.2", "1.1", "1.0", "Base"])
-        lang_layout.addWidget(QLabel("Versión:"))
-        lang_layout.addWidget(self.version_combo)
-        layout.addLayout(lang_layout)
-
-        # Opciones en menú desplegable
-        opts_layout = QHBoxLayout()
-        self.btn_options = QPushButton("Opciones")
+        # Detectar si estamos dentro de una lista de reglas (rulesStrings)
+        is_rules_list = (node.tag == 'rulesStrings' and tag == 'li')
         
-        self.opts_menu = QMenu(self)
-        self.opts_menu.setToolTipsVisible(True)
-        self.act_popup = QAction("Mostrar aviso al finalizar", self)
-        self.act_popup.setCheckable(True)
-        self.act_popup.setChecked(True)
-        self.act_popup.setToolTip("Muestra una ventana emergente confirmando que el proceso ha terminado.")
-        self.act_readme = QAction("Crear archivo LEEME", self)
-        self.act_readme.setCheckable(True)
-        self.act_readme.setChecked(True)
-        self.act_readme.setToolTip("Genera un archivo de texto con instrucciones de instalación en la carpeta de salida.")
-        self.act_merge = QAction("Combinar todo en versión destino", self)
-        self.act_merge.setCheckable(True)
-        self.act_merge.setChecked(False)
-        self.act_merge.setToolTip("Fusiona el contenido de todas las versiones encontradas dentro de la carpeta de la versión seleccionada.")
-        self.act_simplify_mods = QAction("Integrar contenido de Mods en raíz", self)
-        self.act_simplify_mods.setCheckable(True)
-        self.act_simplify_mods.setChecked(False)
-        self.act_simplify_mods.setToolTip("Elimina la estructura de carpetas 'Mods/NombreMod' y mueve todo el contenido directamente a la carpeta principal.")
-        self.act_clean = QAction("Limpiar carpeta de salida", self)
-        self.act_clean.setCheckable(True)
-        self.act_clean.setChecked(False)
-        self.act_clean.setToolTip("Elimina la carpeta de destino antes de generar los archivos para asegurar una extracción limpia.")
-        self.act_recover_implicit = QAction("Recuperar líneas implícitas (Legacy)", self)
-        self.act_recover_implicit.setCheckable(True)
-        self.act_recover_implicit.setChecked(False)
-        self.act_recover_implicit.setToolTip("Intenta recuperar traducciones de líneas que no están en el XML (ej. deathMessage heredado) usando el archivo y validando con el inglés.")
-        self.act_create_about = QAction("Crear About.xml (Metadata)", self)
-        self.act_create_about.setCheckable(True)
-        self.act_create_about.setChecked(True)
-        self.act_create_about.setToolTip("Genera una carpeta About con un archivo About.xml mínimo (nombre, autor, packageId) extraído del mod original.")
+        # Si es un nodo final con texto, verificar si es traducible
+        if child.text and child.text.strip() and len(child) == 0:
+            # Verificar blacklist
+            tag_lower = _lc_cache.get(tag)
+            if tag_lower is None:
+                tag_lower = _lc_cache[tag] = sys.intern(tag.lower())
+            if es_bloqueada(tag_lower):
+                pass
+            # Si el tag está en nuestra lista blanca o es un índice de una lista traducible
+            elif es_traducible(tag_lower) or is_rules_list:
+                results.append({'key': new_path, 'value': child.text.strip()})
         
-        self.opts_menu.addAction(self.act_popup)
-        self.opts_menu.addAction(self.act_readme)
-        self.opts_menu.addAction(self.act_merge)
-        self.opts_menu.addAction(self.act_simplify_mods)
-        self.opts_menu.addAction(self.act_clean)
-        self.opts_menu.addAction(self.act_recover_implicit)
-        self.opts_menu.addAction(self.act_create_about)
-        self.btn_options.setMenu(self.opts_menu)
+        # Continuar buscando en profundidad
+        extract_recursive(child, new_path, results, es_traducible, es_bloqueada)
+
+def _render_entries(entries, existing_translations, archive_translations, local_translations):
+    """
+    Arma el contenido de una plantilla de DefInjected como lista de fragmentos de texto.
+    entries son tuplas (def_name, orden, clave, campo, valor) ya ordenadas.
+    Los métodos usados en cada entrada se ligan una vez a variables locales.
+    """
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<LanguageData>\n  \n']
+    append = parts.append
+    existing_get = existing_translations.get
+    used_keys = set()
+    add_used = used_keys.add
+    
+    last_def = None
+    for current_def, _, key, field, value in entries:
+        add_used(key)
         
-        opts_layout.addWidget(self.btn_options)
-        opts_layout.addStretch()
-        layout.addLayout(opts_layout)
-
-        # Botón principal
-        self.btn_run = QPushButton("Generar Archivos de Traducción")
-        self.btn_run.setStyleSheet("background-color: #2c3e50; color: white; font-weight: bold; padding: 10px;")
-        self.btn_run.clicked.connect(self.run_extraction)
-        layout.addWidget(self.btn_run)
+        if last_def and current_def != last_def:
+            append('\n')
 
-        # Área de log
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
-        self.log_output.setStyleSheet("background-color: #1e1e1e; color: #d4d4d4; font-family: Consolas;")
-        layout.addWidget(self.log_output)
+        original_text = value.replace('--', '- -') # Evitar romper comentarios XML
         
-        # --- Panel derecho: Etiquetas editables ---
-        right_layout.addWidget(QLabel("<b>Etiquetas Traducibles:</b>"))
-        self.translatable_input = QTextEdit()
-        self.translatable_input.setPlaceholderText("Separadas por comas: label, description, ...")
-        self.translatable_input.setMaximumHeight(200)
-        right_layout.addWidget(self.translatable_input)
+        val_to_write = existing_get(key, "TODO")
         
-        right_layout.addWidget(QLabel("<b>Etiquetas Excluidas:</b>"))
-        self.blacklist_input = QTextEdit()
-        self.blacklist_input.setPlaceholderText("Separadas por comas: verbClass, texPath, ...")
-        self.blacklist_input.setMaximumHeight(200)
-        right_layout.addWidget(self.blacklist_input)
+        # Si es TODO, intentar recuperar del archivo
+        if val_to_write == "TODO" or val_to_write == "":
+            # 1. Prioridad: Archivo específico en la misma ruta
+            if key in local_translations:
+                val_to_write = local_translations[key]
+            # 2. Fallback: Búsqueda global
+            elif key in archive_translations:
+                val_to_write = archive_translations[key]
+            # Fallback para Backstories (baseDesc <-> description) y title <-> label:
+            # la clave alternativa se construye una sola vez a partir del último segmento
+            else:
+                _, sep, last = key.rpartition('.')
+                swap = _SUFFIX_SWAPS.get(last) if sep else None
+                if swap is not None:
+                    alt_key = key.replace(f'.{last}', f'.{swap}')
+                    if alt_key in archive_translations:
+                        val_to_write = archive_translations[alt_key]
+            
+        append(f'  <!-- EN: {original_text} -->\n  <{key}>{_fast_escape(val_to_write)}</{key}>\n')
         
-        # Botón para reestablecer valores por defecto
-        btn_reset_tags = QPushButton("Restablecer por defecto")
-        btn_reset_tags.clicked.connect(self.reset_default_tags)
-        right_layout.addWidget(btn_reset_tags)
+        last_def = current_def
+    
+    # Preservar traducciones antiguas (INUTILIZADO)
+    unused_keys = [k for k in existing_translations if k not in used_keys]
+    if unused_keys:
+        append('\n  <!-- INUTILIZADO -->\n')
+        for k in unused_keys:
+            val = existing_translations[k]
+            append(f'  <!-- <{k}>{val}</{k}> -->\n')
+    
+    append('  \n</LanguageData>')
+    return parts
+
+def save_translations(translations_dict, original_filename, target_base_path, archive_base_path, avisos):
+    # Usar la caché global cargada al inicio
+    archive_translations = _archive_translations
+    results_log = []
+
+    for def_type, entries in translations_dict.items():
+        if not entries: continue
+
+        # Cargar traducciones locales específicas para este DefType/Archivo (Prioridad Alta)
+        local_translations = {}
+        if archive_base_path:
+            # Si el archivo no existe, load_single_xml_translations devuelve un dict vacío
+            local_translations = load_single_xml_translations(os.path.join(archive_base_path, def_type, original_filename))
+
+        # --- RECUPERAR CLAVES EXTRA (OPCIONAL) ---
+        if _recover_implicit:
+            present_defs = set()
+            present_keys = set()
+            for entry in entries:
+                key = entry['key']
+                present_keys.add(key)
+                if '.' in key:
+                    present_defs.add(key.split('.')[0])
+                else:
+                    present_defs.add(key)
+            
+            # Buscar en el archivo claves que pertenezcan a estos Defs (con el índice por Def).
+            # El orden entre Defs distintos no importa: las entradas se ordenan por def_name
+            extra_entries = []
+            for def_part in present_defs:
+                for arch_key in _archive_by_def.get(def_part, ()):
+                    if arch_key not in present_keys:
+                        # Intentar obtener el inglés real, si no, marcar como implícito
+                        english_text = _english_translations.get(arch_key, "(Implicit/Inherited)")
+                        
+                        # Solo añadir si tenemos inglés O si el usuario realmente quiere forzarlo
+                        # Aquí permitimos todo lo que esté en el archivo de traducción
+                        extra_entries.append({
+                            'key': arch_key, 
+                            'value': english_text 
+                        })
+            entries.extend(extra_entries)
+        # -----------------------------------------------------------------------
+
+        # --- AJUSTE: Renombrar baseDesc a description y Ordenar ---
+        is_backstory = 'Backstory' in def_type
+        processed_entries = []
         
-        right_layout.addStretch()
+        for entry in entries:
+            key = entry['key']
+            value = entry['value']
+            
+            # Sin punto, partition deja el campo vacío
+            def_name, _, field = key.partition('.')
+
+            # Si es Backstory, cambiamos baseDesc por description
+            if is_backstory and field == 'baseDesc':
+                field = 'description'
+                key = f"{def_name}.{field}"
+            
+            # Tuplas ya listas para ordenar: (def_name, orden, clave, campo, valor)
+            processed_entries.append((def_name, _FIELD_ORDER.get(field, 99), key, field, value))
+
+        # Ordenar: label (1) -> description (2) -> title (3) -> titleShort (4) -> baseDesc (5) -> deathMessage (6) -> endMessage (7) -> otros (99)
+        # Solo por los dos primeros campos, para que los empates conserven el orden del archivo
+        processed_entries.sort(key=itemgetter(0, 1))
         
-        # Cargar valores iniciales en los cuadros
-        self.load_tags_to_ui()
+        entries = processed_entries
+        # ----------------------------------------------------------
+
+        output_dir = os.path.join(target_base_path, def_type)
+        if output_dir not in _created_dirs:
+            os.makedirs(output_dir, exist_ok=True)
+            _created_dirs.add(output_dir)
+        output_file = os.path.join(output_dir, original_filename)
+        
+        existing_translations = {}
+        if os.path.exists(output_file):
+            try:
+                existing_translations = {tag: text.strip() for tag, text in _read_existing_top_level(output_file).items()}
+            except Exception as e:
+                avisos.append(f"Advertencia: Error leyendo archivo existente {original_filename}: {e}")
 
-    def open_folder(self, path):
-        if path and os.path.exists(path):
-            QDesktopServices.openUrl(QUrl.fromLocalFile(path))
-        else:
-            QMessageBox.warning(self, "Aviso", "La ruta no existe o está vacía.")
-    
-    def load_tags_to_ui(self):
-        """Cargar las listas de etiquetas en los cuadros de texto"""
-        self.translatable_input.setPlainText(", ".join(self.translatable_tags))
-        self.blacklist_input.setPlainText(", ".join(self.blacklisted_tags))
-    
-    def update_tags_from_ui(self):
-        """Actualizar las listas desde los cuadros de texto"""
-        translatable_text = self.translatable_input.toPlainText()
-        blacklist_text = self.blacklist_input.toPlainText()
+        # Escribir manualmente para incluir comentarios y formato TODO.
+        # El contenido se arma en una lista y se escribe de una sola vez
+        parts = _render_entries(entries, existing_translations, archive_translations, local_translations)
+        _write_parts(output_file, parts)
         
-        # Parsear separando por comas y limpiando espacios
-        self.translatable_tags = [tag.strip() for tag in translatable_text.split(',') if tag.strip()]
-        self.blacklisted_tags = [tag.strip() for tag in blacklist_text.split(',') if tag.strip()]
-    
-    def reset_default_tags(self):
-        """Restablecer las etiquetas a los valores por defecto"""
-        self.translatable_tags = [
-            'label', 'description', 'jobString', 'reportString', 'pawnLabel', 
-            'graphLabel', 'verb', 'gerund', 'deathMessage', 'skillLabel', 
-            'labelNoun', 'labelShort', 'labelPlural', 'adjective', 'text', 
-            'rejectionMessage', 'helpText', 'labelShortAdj', 'flavorText',
-            'title', 'titleShort', 'baseDesc', 'titleFemale', 'titleShortFemale',
-            'letterLabel', 'letterText', 'extraOutcomeDesc',
-            'customLabel', 'chargeNoun', 'endMessage'
-        ]
-        self.blacklisted_tags = [
-            'verbClass', 'commandTexture', 'commandLabelKey', 'texPath', 'iconPath'
-        ]
-        self.load_tags_to_ui()
-        QMessageBox.information(self, "Restablecido", "Las etiquetas han sido restablecidas a los valores por defecto.")
+        action = "Actualizado" if existing_translations else "Generado"
+        results_log.append(f"[{action}] {def_type}/{original_filename}")
+    return results_log
 
-    def browse_mod(self):
-        start_dir = self.defs_input.text() or os.path.dirname(os.path.abspath(__file__))
-        directory = QFileDialog.getExistingDirectory(self, "Seleccionar carpeta del Mod", start_dir)
-        if directory:
-            self.defs_input.setText(directory)
 
-    def browse_archive(self):
-        directory = QFileDialog.getExistingDirectory(self, "Seleccionar carpeta de Archivo de Traducciones")
-        if directory:
-            self.archive_input.setText(directory)
+class ExtractionWorker(QThread):
+    """Ejecuta la extracción fuera del hilo de la interfaz para que la ventana siga respondiendo."""
+    log = Signal(str)
+    finished = Signal(int)
+    error = Signal(str)
 
-    def log(self, message):
-        self.log_output.append(message)
+    def __init__(self, mod_path, archive_root, output_lang, target_version, merge_versions, simplify_mods,
+                 clean_output, recover_implicit, make_readme, make_about, translatable_set, blacklist_set,
+                 strict_tag_match=False):
+        super().__init__()
+        self.mod_path = mod_path
+        self.archive_root = archive_root
+        self.output_lang = output_lang
+        self.target_version = target_version
+        self.merge_versions = merge_versions
+        self.simplify_mods = simplify_mods
+        self.clean_output = clean_output
+        self.recover_implicit = recover_implicit
+        self.make_readme = make_readme
+        self.make_about = make_about
+        self.translatable_set = translatable_set
+        self.blacklist_set = blacklist_set
+        self.strict_tag_match = strict_tag_match
+        # Carpeta centralizada de salida: Mod/Plantillas Traducciones/SpanishLatin
+        self.output_root = mod_path / "Plantillas Traducciones" / output_lang
+        self.global_archive_translations = {}
+        self.english_translations = {}
+        self._archive_cache = {}
+        self.archive_lang_path = None
+        self._references_loaded = False
+        self._created_dirs = set()
 
-    def load_config(self):
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    last_path = config.get('last_mod_path', '')
-                    if last_path and os.path.exists(last_path):
-                        self.defs_input.setText(last_path)
-                    archive_path = config.get('archive_path', '')
-                    if archive_path and os.path.exists(archive_path):
-                        self.archive_input.setText(archive_path)
-                    version = config.get('target_version', 'Todas')
-                    idx = self.version_combo.findText(version)
-                    if idx >= 0: self.version_combo.setCurrentIndex(idx)
-                    self.act_popup.setChecked(config.get('show_popup', True))
-                    self.act_readme.setChecked(config.get('create_readme', True))
-                    self.act_merge.setChecked(config.get('merge_versions', False))
-                    self.act_simplify_mods.setChecked(config.get('simplify_mods', False))
-                    self.act_clean.setChecked(config.get('clean_output', False))
-                    self.act_recover_implicit.setChecked(config.get('recover_implicit', False))
-                    self.act_create_about.setChecked(config.get('create_about', True))
-                    
-                    # Cargar etiquetas personalizadas si existen
-                    if 'translatable_tags' in config:
-                        self.translatable_tags = config['translatable_tags']
-                    if 'blacklisted_tags' in config:
-                        self.blacklisted_tags = config['blacklisted_tags']
-            except Exception:
-                pass
+    def load_references(self):
+        """Cargar (una sola vez) las traducciones globales del archivo y, si se piden, las del inglés."""
+        if self._references_loaded:
+            return
+        self._references_loaded = True
 
-    def save_config(self):
-        try:
-            # Actualizar etiquetas desde la UI
-            self.update_tags_from_ui()
-            
-            config = {
-                'last_mod_path': self.defs_input.text(),
-                'archive_path': self.archive_input.text(),
-                'target_version': self.version_combo.currentText(),
-                'show_popup': self.act_popup.isChecked(),
-                'create_readme': self.act_readme.isChecked(),
-                'merge_versions': self.act_merge.isChecked(),
-                'simplify_mods': self.act_simplify_mods.isChecked(),
-                'clean_output': self.act_clean.isChecked(),
-                'recover_implicit': self.act_recover_implicit.isChecked(),
-                'create_about': self.act_create_about.isChecked(),
-                'translatable_tags': self.translatable_tags,
-                'blacklisted_tags': self.blacklisted_tags
-            }
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=2)
-        except Exception:
-            pass
+        # Cargar traducciones globales una sola vez y limpias de TODOs
+        if self.archive_lang_path:
+            self.global_archive_translations = self.load_archive_translations(self.archive_lang_path)
+
+        # Cargar traducciones en INGLÉS para validar implícitos
+        if self.recover_implicit:
+            english_dirs = [self.mod_path / "Languages" / "English", self.mod_path / "Languages" / "English (United Kingdom)"]
+            for eng_dir in english_dirs:
+                if eng_dir.exists():
+                    self.log.emit(f"Cargando fuente en Inglés desde: {eng_dir.name}...")
+                    self.english_translations = self.load_archive_translations(eng_dir)
+                    break
 
     def load_archive_translations(self, archive_path):
+        # Memoizado por ruta y fecha de modificación durante esta extracción
+        if not archive_path:
+            return {}
+        try:
+            key = (str(archive_path), archive_path.stat().st_mtime_ns)
+        except OSError:
+            return {}
+        translations = self._archive_cache.get(key)
+        if translations is None:
+            translations = self._archive_cache[key] = self._load_archive_translations(archive_path)
+        return translations
+
+    def _load_archive_translations(self, archive_path):
         translations = {}
         if archive_path and archive_path.exists():
-            # self.log(f"Indexando referencias desde: {archive_path}...")
-            count = 0
+            # self.log.emit(f"Indexando referencias desde: {archive_path}...")
             for arch_file in archive_path.rglob("*.xml"):
                 try:
-                    tree = ET.parse(arch_file)
-                    root = tree.getroot()
-                    for child in root:
-                        if child.tag and child.text:
-                            text = child.text.strip()
-                            if text and text.upper() != "TODO":
-                                translations[child.tag] = text
-                                count += 1
+                    # Se acumula por archivo para no dejar entradas a medias si el XML falla
+                    translations.update(_leer_traducciones(arch_file))
                 except Exception as e:
-                    self.log(f"Advertencia: No se pudo leer referencia {arch_file.name}: {e}")
-            self.log(f"Referencias cargadas desde archivo")
+                    self.log.emit(f"Advertencia: No se pudo leer referencia {arch_file.name}: {e}")
+            self.log.emit(f"Referencias cargadas desde archivo")
         return translations
 
-    def load_single_xml_translations(self, file_path):
-        translations = {}
-        try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            for child in root:
-                if child.tag and child.text:
-                    text = child.text.strip()
-                    if text and text.upper() != "TODO":
-                        translations[child.tag] = text
-        except Exception:
-            pass
-        return translations
-
-    def run_extraction(self):
-        # Actualizar las etiquetas desde la UI antes de procesar
-        self.update_tags_from_ui()
-        
-        self.save_config()
-        mod_path = Path(self.defs_input.text())
-        output_lang = self.lang_input.text()
-        target_version = self.version_combo.currentText()
-        merge_versions = self.act_merge.isChecked()
-        simplify_mods = self.act_simplify_mods.isChecked()
-        
-        # Carpeta centralizada de salida: Mod/Plantillas Traducciones/SpanishLatin
-        output_root = mod_path / "Plantillas Traducciones" / output_lang
-
-        self.log_output.clear()
+    def run(self):
+        mod_path = self.mod_path
+        output_lang = self.output_lang
+        target_version = self.target_version
+        merge_versions = self.merge_versions
+        simplify_mods = self.simplify_mods
+        output_root = self.output_root
         
-        if self.act_clean.isChecked() and output_root.exists():
+        if self.clean_output and output_root.exists():
             try:
                 shutil.rmtree(output_root)
-                self.log(f"Carpeta de salida limpiada: {output_root}")
+                self.log.emit(f"Carpeta de salida limpiada: {output_root}")
             except Exception as e:
-                self.log(f"Error al limpiar carpeta de salida: {e}")
+                self.log.emit(f"Error al limpiar carpeta de salida: {e}")
 
-        self.log("============================================================")
-        self.log(f" Plantilla Traduccion: {mod_path.name}")
-        self.log(f" Idioma destino: {output_lang}")
-        self.log("============================================================")
-        self.log("")
+        self.log.emit("============================================================")
+        self.log.emit(f" Plantilla Traduccion: {mod_path.name}")
+        self.log.emit(f" Idioma destino: {output_lang}")
+        self.log.emit("============================================================")
+        self.log.emit("")
         
         # --- Buscar carpeta de referencia en el Archivo ---
         archive_lang_path = None
-        archive_root_str = self.archive_input.text()
+        archive_root_str = self.archive_root
         if archive_root_str and os.path.exists(archive_root_str):
             mod_dir_name = mod_path.name
             candidate_mod = Path(archive_root_str) / mod_dir_name
@@ -370,123 +754,101 @@ class RimWorldTranslatorGUI(QMainWindow):
                     search_dirs.append(candidate_mod / "Languages")
                 
                 found = False
+                output_lang_lower = output_lang.lower()
                 for search_dir in search_dirs:
                     for item in search_dir.iterdir():
-                        if item.is_dir() and item.name.lower().startswith(output_lang.lower()):
+                        if item.is_dir() and item.name.lower().startswith(output_lang_lower):
                             archive_lang_path = item
                             found = True
                             break
                     if found: break
                 
                 if archive_lang_path:
-                    pass # self.log(f"Referencia encontrada en archivo: {archive_lang_path}")
+                    pass # self.log.emit(f"Referencia encontrada en archivo: {archive_lang_path}")
                 else:
-                    self.log(f"Aviso: Mod encontrado en archivo, pero no el idioma '{output_lang}'.")
+                    self.log.emit(f"Aviso: Mod encontrado en archivo, pero no el idioma '{output_lang}'.")
             else:
-                pass # self.log(f"No se encontró el mod '{mod_dir_name}' en la carpeta de archivo.")
+                pass # self.log.emit(f"No se encontró el mod '{mod_dir_name}' en la carpeta de archivo.")
 
-        # Cargar traducciones globales una sola vez y limpias de TODOs
-        self.global_archive_translations = {}
-        if archive_lang_path:
-            self.global_archive_translations = self.load_archive_translations(archive_lang_path)
-
-        # Cargar traducciones en INGLÉS para validar implícitos
-        self.english_translations = {}
-        if self.act_recover_implicit.isChecked():
-            english_dirs = [mod_path / "Languages" / "English", mod_path / "Languages" / "English (United Kingdom)"]
-            for eng_dir in english_dirs:
-                if eng_dir.exists():
-                    self.log(f"Cargando fuente en Inglés desde: {eng_dir.name}...")
-                    self.english_translations = self.load_archive_translations(eng_dir)
-                    break
+        # Las traducciones del archivo y del inglés se cargan al llegar al primer archivo a procesar
+        self.archive_lang_path = archive_lang_path
 
         try:
+            # Un único recorrido del mod para encontrar las carpetas Defs y Keyed
+            defs_directories, keyed_directories = _discover(mod_path)
+
             # --- 1. Procesar DEFS ---
-            defs_directories = []
-            for root, dirs, files in os.walk(mod_path):
-                if os.path.basename(root).lower() == 'defs':
-                    defs_directories.append(Path(root))
 
             # Ordenar para que las versiones salgan en orden (1.3, 1.4, 1.5...)
             defs_directories.sort(key=lambda p: str(p))
 
             total_files_processed = 0
-            for defs_path in defs_directories:
-                # Calcular ruta relativa para mantener estructura (ej. 1.5/Defs -> 1.5)
-                try:
-                    rel_path = defs_path.parent.relative_to(mod_path)
-                except ValueError:
-                    rel_path = Path(".")
-                
-                should_process = True
-                output_rel_path = rel_path
-
-                if target_version != "Todas":
-                    if merge_versions:
-                        # Si combinamos, redirigimos todo a la versión destino
-                        target_path = Path(target_version) if target_version != "Base" else Path(".")
-                        
-                        # Lógica para reemplazar la versión origen con la destino en la ruta
-                        parts = rel_path.parts
-                        if str(rel_path) == ".":
-                            output_rel_path = target_path
-                        elif re.match(r'^\d+\.\d+$', parts[0]):
-                            output_rel_path = target_path.joinpath(*parts[1:])
-                        else:
-                            output_rel_path = target_path / rel_path
-                    else:
-                        is_base = str(rel_path) == "."
-                        if target_version == "Base" and not is_base: should_process = False
-                        if target_version != "Base" and str(rel_path) != target_version: should_process = False
-                
-                if not should_process: continue
-
-                if simplify_mods:
-                    parts_out = list(output_rel_path.parts)
-                    mods_idx = -1
-                    for i, p in enumerate(parts_out):
-                        if p.lower() == 'mods':
-                            mods_idx = i
-                            break
-                    if mods_idx != -1 and len(parts_out) > mods_idx + 1:
-                        del parts_out[mods_idx:mods_idx+2]
-                        output_rel_path = Path(*parts_out) if parts_out else Path(".")
-
-                version_label = f"Version {rel_path}" if str(rel_path) != "." else "Version Base"
-                if merge_versions and target_version != "Todas" and str(rel_path) != str(output_rel_path):
-                    version_label += f" -> Combinado en {output_rel_path}"
-
-                target_base_path = output_root / output_rel_path / "DefInjected"
+            # Pool de procesos para los archivos de Defs (el parseo es CPU-bound y cada archivo es independiente)
+            translatable_set = self.translatable_set
+            blacklist_set = self.blacklist_set
+            needles = _needles(translatable_set)
+            output_root_str = os.fspath(output_root)
+            archive_lang_str = os.fspath(archive_lang_path) if archive_lang_path else None
+            executor = None
+            try:
+                for defs_path in defs_directories:
+                    # Calcular ruta relativa para mantener estructura (ej. 1.5/Defs -> 1.5)
+                    try:
+                        rel_path = defs_path.parent.relative_to(mod_path)
+                    except ValueError:
+                        rel_path = Path(".")
+                    # Texto de la ruta relativa, calculado una vez para las comparaciones
+                    rel_str = str(rel_path)
+
+                    # Las carpetas de otras versiones se descartan antes de listar sus archivos
+                    should_process, output_rel_path = _resolve_output(rel_path, target_version, merge_versions, simplify_mods)
+                    if not should_process: continue
+
+                    version_label = f"Version {rel_str}" if rel_str != "." else "Version Base"
+                    if merge_versions and target_version != "Todas" and rel_str != str(output_rel_path):
+                        version_label += f" -> Combinado en {output_rel_path}"
+
+                    # Las rutas viajan como texto: los procesos solo las unen con os.path.join
+                    target_base_path = _ruta_destino(output_root_str, output_rel_path, "DefInjected")
                 
-                # Ruta equivalente en el archivo para Defs
-                # Intentamos construir la ruta específica espejo en el archivo
-                archive_base_path = None
-                if archive_lang_path:
-                    archive_base_path = archive_lang_path / output_rel_path / "DefInjected"
+                    # Ruta equivalente en el archivo para Defs
+                    # Intentamos construir la ruta específica espejo en el archivo
+                    archive_base_path = None
+                    if archive_lang_path:
+                        archive_base_path = _ruta_destino(archive_lang_str, output_rel_path, "DefInjected")
                 
-                version_files_log = []
+                    version_files_log = []
                 
-                for root, _, files in os.walk(str(defs_path)):
-                    for file in files:
-                        if file.endswith('.xml'):
-                            file_path = os.path.join(root, file)
-                            results = self.process_file(file_path, file, target_base_path, archive_base_path)
-                            version_files_log.extend(results)
+                    tareas = [(file_path, file, target_base_path, archive_base_path, translatable_set, blacklist_set, needles,
+                               self.strict_tag_match)
+                              for file_path, file in _iter_xml(defs_path)]
+                    if not tareas: continue
+
+                    if executor is None:
+                        # El pool recibe las referencias al crearse, así que se crea con el primer archivo
+                        self.load_references()
+                        executor = ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_iniciar_proceso,
+                                                       initargs=(self.global_archive_translations, self.english_translations,
+                                                                 self.recover_implicit))
+
+                    # Los archivos se procesan en paralelo; los avisos se registran aquí, en orden
+                    for results, avisos in _map_en_orden(executor, tareas):
+                        for aviso in avisos:
+                            self.log.emit(aviso)
+                        version_files_log.extend(results)
                 
-                if version_files_log:
-                    self.log(f"\n{version_label}")
-                    for line in version_files_log:
-                        self.log(f"   └── {line}")
-                    total_files_processed += len(version_files_log)
+                    if version_files_log:
+                        # Un solo append por versión: cada append re-maqueta el documento del log
+                        self.log.emit(f"\n{version_label}\n" + "\n".join(f"   └── {line}" for line in version_files_log))
+                        total_files_processed += len(version_files_log)
+
+            finally:
+                if executor is not None:
+                    executor.shutdown()
 
             # --- 2. Procesar KEYED ---
-            keyed_directories = []
-            for root, dirs, files in os.walk(mod_path):
-                if os.path.basename(root).lower() == 'keyed':
-                    if 'english' in os.path.basename(os.path.dirname(root)).lower():
-                        keyed_directories.append(Path(root))
-            
             keyed_files_log = []
+            keyed_tareas = []
             for keyed_path in keyed_directories:
                 # Calcular ruta relativa (ej. 1.5/Languages/English/Keyed -> 1.5)
                 try:
@@ -494,211 +856,85 @@ class RimWorldTranslatorGUI(QMainWindow):
                 except ValueError:
                     rel_path = Path(".")
 
-                should_process = True
-                output_rel_path = rel_path
-
-                if target_version != "Todas":
-                    if merge_versions:
-                        target_path = Path(target_version) if target_version != "Base" else Path(".")
-                        parts = rel_path.parts
-                        if str(rel_path) == ".":
-                            output_rel_path = target_path
-                        elif re.match(r'^\d+\.\d+$', parts[0]):
-                            output_rel_path = target_path.joinpath(*parts[1:])
-                        else:
-                            output_rel_path = target_path / rel_path
-                    else:
-                        is_base = str(rel_path) == "."
-                        if target_version == "Base" and not is_base: should_process = False
-                        if target_version != "Base" and str(rel_path) != target_version: should_process = False
-                
+                should_process, output_rel_path = _resolve_output(rel_path, target_version, merge_versions, simplify_mods)
                 if not should_process: continue
 
-                if simplify_mods:
-                    parts_out = list(output_rel_path.parts)
-                    mods_idx = -1
-                    for i, p in enumerate(parts_out):
-                        if p.lower() == 'mods':
-                            mods_idx = i
-                            break
-                    if mods_idx != -1 and len(parts_out) > mods_idx + 1:
-                        del parts_out[mods_idx:mods_idx+2]
-                        output_rel_path = Path(*parts_out) if parts_out else Path(".")
-
-                target_keyed_path = output_root / output_rel_path / "Keyed"
+                target_keyed_path = _ruta_destino(output_root_str, output_rel_path, "Keyed")
                 
                 # Ruta equivalente en el archivo para Keyed
                 # Intentamos construir la ruta específica espejo en el archivo
                 archive_keyed_path = None
                 if archive_lang_path:
-                    archive_keyed_path = archive_lang_path / output_rel_path / "Keyed"
+                    archive_keyed_path = _ruta_destino(archive_lang_str, output_rel_path, "Keyed")
                 
-                for root, _, files in os.walk(str(keyed_path)):
-                    for file in files:
-                        if file.endswith('.xml'):
-                            file_path = os.path.join(root, file)
-                            results = self.process_keyed_file(file_path, file, target_keyed_path, archive_keyed_path)
-                            keyed_files_log.extend(results)
+                keyed_tareas.extend((file_path, file, target_keyed_path, archive_keyed_path)
+                                    for file_path, file in _iter_xml(keyed_path))
+
+            if keyed_tareas:
+                self.load_references()
+                # Los Keyed son sobre todo lectura y escritura de archivos (liberan el GIL):
+                # basta un pool de hilos, que comparte las referencias ya cargadas
+                with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4)) as pool:
+                    for results, avisos in _map_en_orden(pool, keyed_tareas, self._process_keyed_tarea):
+                        for aviso in avisos:
+                            self.log.emit(aviso)
+                        keyed_files_log.extend(results)
             
             if keyed_files_log:
-                self.log(f"\nTextos Keyed (General)")
-                for line in keyed_files_log:
-                    self.log(f"   └── {line}")
+                self.log.emit("\nTextos Keyed (General)\n" + "\n".join(f"   └── {line}" for line in keyed_files_log))
                 total_files_processed += len(keyed_files_log)
             
-            self.log("\n------------------------------------------------------------")
-            self.log(f"Proceso completado! Archivos procesados: {total_files_processed}")
+            self.log.emit("\n------------------------------------------------------------")
+            self.log.emit(f"Proceso completado! Archivos procesados: {total_files_processed}")
             
-            if total_files_processed == 0:
-                QMessageBox.warning(self, "Aviso", "No se encontraron archivos Defs ni Keyed (en inglés).")
-            else:
-                if self.act_readme.isChecked():
+            if total_files_processed > 0:
+                if self.make_readme:
                     self.create_readme(output_root)
                 
-                if self.act_create_about.isChecked():
+                if self.make_about:
                     self.create_minimal_about(mod_path, output_root.parent)
-                
-                if self.act_popup.isChecked():
-                    QMessageBox.information(self, "Éxito", f"Traducciones generadas en:\n{output_root}")
         except Exception as e:
-            self.log(f"ERROR CRÍTICO: {str(e)}")
-            QMessageBox.critical(self, "Error", f"Ocurrió un error: {e}")
-
-    def process_file(self, file_path, file_name, target_base_path, archive_base_path=None):
-        try:
-            tree = ET.parse(file_path)
-            xml_root = tree.getroot()
-        except ET.ParseError:
-            self.log(f"Error al parsear: {file_name}")
-            return []
+            self.log.emit(f"ERROR CRÍTICO: {str(e)}")
+            self.error.emit(str(e))
+            return
 
-        translations_by_type = {}
+        self.finished.emit(total_files_processed)
 
-        for def_node in xml_root:
-            if not isinstance(def_node.tag, str): continue
-            
-            def_type = def_node.tag
-            def_name_node = def_node.find('defName')
-            
-            if def_name_node is None: continue
-            
-            def_name = def_name_node.text
-            if not def_name: continue
-            
-            if def_type not in translations_by_type:
-                translations_by_type[def_type] = []
-
-            # Iniciar búsqueda recursiva dentro del Def
-            self.extract_recursive(def_node, def_name, translations_by_type[def_type])
-
-        if translations_by_type:
-            return self.save_translations(translations_by_type, file_name, target_base_path, archive_base_path)
-        return []
-
-    def extract_recursive(self, node, current_path, results):
-        # Helper para obtener el nombre base de un nodo lista
-        def get_li_name(element):
-            # 1. Intentar usar customLabel (prioridad para BodyParts)
-            custom_label = element.find('customLabel')
-            if custom_label is not None and custom_label.text:
-                text = custom_label.text.strip()
-                # Sanitizar: espacios a guiones bajos, mantener solo caracteres seguros
-                text = text.replace(' ', '_')
-                return "".join(c for c in text if c.isalnum() or c in ('_', '-'))
-            
-            # 2. Intentar usar def
-            def_node = element.find('def')
-            if def_node is not None and def_node.text:
-                return def_node.text.strip()
-            return None
-
-        # Pre-calcular conteos para manejar duplicados
-        name_counts = {}
-        li_children_names = []
-        
-        for child in node:
-            if child.tag == 'li':
-                name = get_li_name(child)
-                if name:
-                    name_counts[name] = name_counts.get(name, 0) + 1
-                li_children_names.append(name)
-            else:
-                li_children_names.append(None)
-
-        name_indices = {}
-        li_index = 0
-        
-        for i, child in enumerate(node):
-            tag = child.tag
-            if not isinstance(tag, str) or tag == 'defName':
-                continue
-            
-            part = ""
-            if tag == 'li':
-                name = li_children_names[i]
-                if name:
-                    # Si hay duplicados, usar sufijo numérico
-                    if name_counts.get(name, 0) > 1:
-                        idx = name_indices.get(name, 0)
-                        part = f"{name}-{idx}"
-                        name_indices[name] = idx + 1
-                    else:
-                        part = name
-                else:
-                    # Usar índice numérico si no hay nombre
-                    part = str(li_index)
-                li_index += 1
-            else:
-                part = tag
-            
-            new_path = f"{current_path}.{part}"
-            
-            # Detectar si estamos dentro de una lista de reglas (rulesStrings)
-            is_rules_list = (node.tag == 'rulesStrings' and tag == 'li')
-            
-            # Si es un nodo final con texto, verificar si es traducible
-            if child.text and child.text.strip() and len(child) == 0:
-                # Verificar blacklist
-                if any(b.lower() in tag.lower() for b in self.blacklisted_tags):
-                    pass
-                # Si el tag está en nuestra lista blanca o es un índice de una lista traducible
-                elif any(t.lower() in tag.lower() for t in self.translatable_tags) or is_rules_list:
-                    results.append({'key': new_path, 'value': child.text.strip()})
-            
-            # Continuar buscando en profundidad
-            self.extract_recursive(child, new_path, results)
+    def _process_keyed_tarea(self, tarea):
+        """Procesa un archivo Keyed desde el pool de hilos."""
+        return self.process_keyed_file(*tarea)
 
     def process_keyed_file(self, file_path, file_name, target_dir, archive_dir=None):
-        try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-        except ET.ParseError:
-            self.log(f"Error al parsear Keyed: {file_name}")
-            return []
-
+        """
+        Extrae las cadenas de un archivo Keyed y escribe su plantilla.
+        Como process_file, devuelve (líneas_de_resultado, avisos) para que se registren en orden.
+        """
+        avisos = []
         entries = []
-        for child in root:
-            # Ignorar comentarios o nodos sin texto
-            if child.text:
-                entries.append({'key': child.tag, 'value': child.text.strip()})
+        try:
+            for tag, text in _iter_hijos_raiz(file_path, recover=False):
+                # Ignorar nodos sin texto (los comentarios ya los descarta el parser)
+                if text:
+                    entries.append({'key': tag, 'value': text.strip()})
+        except _ERRORES_XML:
+            avisos.append(f"Error al parsear Keyed: {file_name}")
+            return [], avisos
         
         if entries:
-            return self.save_keyed_translations(entries, file_name, target_dir, archive_dir)
-        return []
+            return self.save_keyed_translations(entries, file_name, target_dir, archive_dir), avisos
+        return [], avisos
 
     def save_keyed_translations(self, entries, original_filename, target_dir, archive_dir=None):
-        target_dir.mkdir(parents=True, exist_ok=True)
-        output_file = target_dir / original_filename
+        if target_dir not in self._created_dirs:
+            os.makedirs(target_dir, exist_ok=True)
+            self._created_dirs.add(target_dir)
+        output_file = os.path.join(target_dir, original_filename)
 
         existing_translations = {}
-        if output_file.exists():
+        if os.path.exists(output_file):
             try:
-                tree = ET.parse(output_file)
-                root = tree.getroot()
-                for child in root:
-                    if child.tag and child.text:
-                        existing_translations[child.tag] = child.text
-            except ET.ParseError:
+                existing_translations = _read_existing_top_level(output_file)
+            except _ERRORES_XML:
                 pass
         
         # Usar la caché global cargada al inicio
@@ -707,41 +943,39 @@ class RimWorldTranslatorGUI(QMainWindow):
         # Intentar cargar traducciones locales específicas (prioridad alta)
         local_translations = {}
         if archive_dir:
-            local_file = archive_dir / original_filename
-            if local_file.exists():
-                local_translations = self.load_single_xml_translations(local_file)
+            local_translations = load_single_xml_translations(os.path.join(archive_dir, original_filename))
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-            f.write('<LanguageData>\n')
+        # Todo el archivo se arma en una lista y se escribe de una sola vez
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<LanguageData>\n']
+        
+        used_keys = set()
+        for entry in entries:
+            used_keys.add(entry['key'])
+            original_text = entry['value'].replace('--', '- -')
+            val_to_write = existing_translations.get(entry['key'], "TODO")
             
-            used_keys = set()
-            for entry in entries:
-                used_keys.add(entry['key'])
-                original_text = entry['value'].replace('--', '- -')
-                val_to_write = existing_translations.get(entry['key'], "TODO")
-                
-                # Si es TODO, intentar recuperar del archivo (Local > Global)
-                if (val_to_write == "TODO" or val_to_write == "") and entry['key'] in archive_translations:
-                    if entry['key'] in local_translations:
-                        val_to_write = local_translations[entry['key']]
-                    else:
-                        val_to_write = archive_translations[entry['key']]
-                
-                val_to_write = escape(val_to_write)
-                
-                f.write(f'\n  <!-- EN: {original_text} -->\n')
-                f.write(f'  <{entry["key"]}>{val_to_write}</{entry["key"]}>\n')
+            # Si es TODO, intentar recuperar del archivo (Local > Global)
+            if (val_to_write == "TODO" or val_to_write == "") and entry['key'] in archive_translations:
+                if entry['key'] in local_translations:
+                    val_to_write = local_translations[entry['key']]
+                else:
+                    val_to_write = archive_translations[entry['key']]
             
-            # Preservar traducciones antiguas (INUTILIZADO)
-            unused_keys = [k for k in existing_translations if k not in used_keys]
-            if unused_keys:
-                f.write('\n  <!-- INUTILIZADO -->\n')
-                for k in unused_keys:
-                    val = existing_translations[k]
-                    f.write(f'  <!-- <{k}>{val}</{k}> -->\n')
+            val_to_write = _fast_escape(val_to_write)
+            
+            parts.append(f'\n  <!-- EN: {original_text} -->\n  <{entry["key"]}>{val_to_write}</{entry["key"]}>\n')
+        
+        # Preservar traducciones antiguas (INUTILIZADO)
+        unused_keys = [k for k in existing_translations if k not in used_keys]
+        if unused_keys:
+            parts.append('\n  <!-- INUTILIZADO -->\n')
+            for k in unused_keys:
+                val = existing_translations[k]
+                parts.append(f'  <!-- <{k}>{val}</{k}> -->\n')
 
-            f.write('\n</LanguageData>\n')
+        parts.append('\n</LanguageData>\n')
+
+        _write_parts(output_file, parts)
         
         action = "Actualizado" if existing_translations else "Generado"
         return [f"[{action}] {original_filename}"]
@@ -749,13 +983,14 @@ class RimWorldTranslatorGUI(QMainWindow):
     def create_readme(self, output_dir):
         try:
             readme_file = output_dir / "LEEME_INSTALACION.txt"
-            with open(readme_file, 'w', encoding='utf-8') as f:
-                f.write("=== CÓMO INSTALAR ESTA TRADUCCIÓN ===\n\n")
-                f.write("1. Ve a la carpeta del mod original.\n")
-                f.write("2. Entra en la carpeta 'Languages' (créala si no existe).\n")
-                f.write(f"3. Dentro, crea una carpeta llamada '{self.lang_input.text()}'.\n")
-                f.write("4. COPIA todo el contenido de esta carpeta (las carpetas 1.5, DefInjected, etc.) y pégalo ahí.\n")
-            self.log("Generado: LEEME_INSTALACION.txt con instrucciones.")
+            readme_file.write_text(
+                "=== CÓMO INSTALAR ESTA TRADUCCIÓN ===\n\n"
+                "1. Ve a la carpeta del mod original.\n"
+                "2. Entra en la carpeta 'Languages' (créala si no existe).\n"
+                f"3. Dentro, crea una carpeta llamada '{self.output_lang}'.\n"
+                "4. COPIA todo el contenido de esta carpeta (las carpetas 1.5, DefInjected, etc.) y pégalo ahí.\n",
+                encoding='utf-8')
+            self.log.emit("Generado: LEEME_INSTALACION.txt con instrucciones.")
         except Exception:
             pass
 
@@ -769,7 +1004,7 @@ class RimWorldTranslatorGUI(QMainWindow):
                     break
             
             if not source_about:
-                self.log("Aviso: No se encontró About.xml en el mod original para extraer metadatos.")
+                self.log.emit("Aviso: No se encontró About.xml en el mod original para extraer metadatos.")
                 return
 
             tree = ET.parse(source_about)
@@ -780,7 +1015,7 @@ class RimWorldTranslatorGUI(QMainWindow):
             packageId = root.find("packageId")
             
             if packageId is None or not packageId.text:
-                self.log("Aviso: El About.xml original no tiene packageId válido.")
+                self.log.emit("Aviso: El About.xml original no tiene packageId válido.")
                 return
 
             # Intentar obtener PublishedFileId
@@ -799,9 +1034,9 @@ class RimWorldTranslatorGUI(QMainWindow):
             # Crear contenido XML manualmente para controlar el formato
             about_content = [
                 "<ModMetaData>",
-                f"\t<name>{escape(name.text if name is not None and name.text else mod_path.name)}</name>",
-                f"\t<author>{escape(author.text if author is not None and author.text else 'Unknown')}</author>",
-                f"\t<packageId>{escape(packageId.text)}</packageId>"
+                f"\t<name>{_fast_escape(name.text if name is not None and name.text else mod_path.name)}</name>",
+                f"\t<author>{_fast_escape(author.text if author is not None and author.text else 'Unknown')}</author>",
+                f"\t<packageId>{_fast_escape(packageId.text)}</packageId>"
             ]
             
             if published_file_id:
@@ -815,10 +1050,9 @@ class RimWorldTranslatorGUI(QMainWindow):
             filename = f"About_{published_file_id}.xml" if published_file_id else "About.xml"
             target_file = about_dir / filename
             
-            with open(target_file, 'w', encoding='utf-8') as f:
-                f.write("\n".join(about_content))
+            target_file.write_text("\n".join(about_content), encoding='utf-8')
                 
-            self.log(f"Generado: About/{filename} con packageId '{packageId.text}'")
+            self.log.emit(f"Generado: About/{filename} con packageId '{packageId.text}'")
             
             # Copiar PublishedFileId.txt si existe (útil para referencias de Steam)
             if published_file_id:
@@ -826,161 +1060,356 @@ class RimWorldTranslatorGUI(QMainWindow):
                 for p in [mod_path / "PublishedFileId.txt", mod_path / "About" / "PublishedFileId.txt"]:
                     if p.exists():
                         shutil.copy2(p, about_dir / "PublishedFileId.txt")
-                        self.log("Copiado: PublishedFileId.txt")
+                        self.log.emit("Copiado: PublishedFileId.txt")
                         break
             
         except Exception as e:
-            self.log(f"Error creando About.xml: {e}")
+            self.log.emit(f"Error creando About.xml: {e}")
 
-    def save_translations(self, translations_dict, original_filename, target_base_path, archive_base_path=None):
-        # Usar la caché global cargada al inicio
-        archive_translations = self.global_archive_translations
-        results_log = []
-
-        for def_type, entries in translations_dict.items():
-            if not entries: continue
-
-            # Cargar traducciones locales específicas para este DefType/Archivo (Prioridad Alta)
-            local_translations = {}
-            if archive_base_path:
-                local_file = archive_base_path / def_type / original_filename
-                if local_file.exists():
-                    local_translations = self.load_single_xml_translations(local_file)
-
-            # --- RECUPERAR CLAVES EXTRA (OPCIONAL) ---
-            if self.act_recover_implicit.isChecked():
-                present_defs = set()
-                present_keys = set()
-                for entry in entries:
-                    key = entry['key']
-                    present_keys.add(key)
-                    if '.' in key:
-                        present_defs.add(key.split('.')[0])
-                    else:
-                        present_defs.add(key)
-                
-                # Buscar en el archivo claves que pertenezcan a estos Defs
-                extra_entries = []
-                for arch_key, arch_val in archive_translations.items():
-                    if '.' in arch_key:
-                        def_part = arch_key.split('.')[0]
-                        if def_part in present_defs and arch_key not in present_keys:
-                            # Intentar obtener el inglés real, si no, marcar como implícito
-                            english_text = self.english_translations.get(arch_key, "(Implicit/Inherited)")
-                            
-                            # Solo añadir si tenemos inglés O si el usuario realmente quiere forzarlo
-                            # Aquí permitimos todo lo que esté en el archivo de traducción
-                            extra_entries.append({
-                                'key': arch_key, 
-                                'value': english_text 
-                            })
-                entries.extend(extra_entries)
-            # -----------------------------------------------------------------------
-
-            # --- AJUSTE: Renombrar baseDesc a description y Ordenar ---
-            is_backstory = 'Backstory' in def_type
-            processed_entries = []
-            
-            for entry in entries:
-                key = entry['key']
-                value = entry['value']
-                
-                if '.' in key:
-                    parts = key.split('.')
-                    def_name = parts[0]
-                    field = '.'.join(parts[1:])
-                else:
-                    def_name = key
-                    field = ""
+class RimWorldTranslatorGUI(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("RimWorld Translation Extractor")
+        self.setMinimumSize(600, 400)
+        self.worker = None
+        # Último contenido guardado de la configuración (para no reescribirla si no cambió)
+        self._last_config_bytes = None
 
-                # Si es Backstory, cambiamos baseDesc por description
-                if is_backstory and field == 'baseDesc':
-                    field = 'description'
-                    key = f"{def_name}.{field}"
-                
-                processed_entries.append({'key': key, 'value': value, 'def_name': def_name, 'field': field})
+        # Archivo de configuración en el directorio del script (Desktop)
+        self.config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extractor_config.json")
 
-            # Ordenar: label (1) -> description (2) -> title (3) -> titleShort (4) -> baseDesc (5) -> deathMessage (6) -> endMessage (7) -> otros (99)
-            processed_entries.sort(key=lambda x: (x['def_name'], {'label': 1, 'description': 2, 'title': 3, 'titleShort': 4, 'baseDesc': 5, 'deathMessage': 6, 'endMessage': 7}.get(x['field'], 99)))
-            
-            entries = processed_entries
-            # ----------------------------------------------------------
+        # Etiquetas que normalmente queremos traducir
+        self.translatable_tags = [
+            'label', 'description', 'jobString', 'reportString', 'pawnLabel', 
+            'graphLabel', 'verb', 'gerund', 'deathMessage', 'skillLabel', 
+            'labelNoun', 'labelShort', 'labelPlural', 'adjective', 'text', 
+            'rejectionMessage', 'helpText', 'labelShortAdj', 'flavorText',
+            'title', 'titleShort', 'baseDesc', 'titleFemale', 'titleShortFemale',
+            'letterLabel', 'letterText', 'extraOutcomeDesc',
+            'customLabel', 'chargeNoun', 'endMessage'
+        ]
 
-            output_dir = target_base_path / def_type
-            output_dir.mkdir(parents=True, exist_ok=True)
-            output_file = output_dir / original_filename
-            
-            existing_translations = {}
-            if output_file.exists():
-                try:
-                    tree = ET.parse(output_file)
-                    root = tree.getroot()
-                    for child in root:
-                        if child.tag and child.text:
-                            existing_translations[child.tag] = child.text.strip()
-                except Exception as e:
-                    self.log(f"Advertencia: Error leyendo archivo existente {output_file.name}: {e}")
+        # Etiquetas técnicas a excluir (blacklist)
+        self.blacklisted_tags = [
+            'verbClass', 'commandTexture', 'commandLabelKey', 'texPath', 'iconPath'
+        ]
 
-            # Escribir manualmente para incluir comentarios y formato TODO
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-                f.write('<LanguageData>\n')
-                f.write('  \n')
-                
-                last_def = None
-                used_keys = set()
-                for entry in entries:
-                    key = entry['key']
-                    used_keys.add(key)
-                    current_def = key.split('.')[0] if '.' in key else key
-                    
-                    if last_def and current_def != last_def:
-                        f.write('\n')
+        self.init_ui()
+        self.load_config()
+        # La auto-detección recorre carpetas: se hace cuando la ventana ya está en marcha
+        QTimer.singleShot(0, self.auto_detect_mod)
 
-                    original_text = entry['value'].replace('--', '- -') # Evitar romper comentarios XML
-                    
-                    val_to_write = existing_translations.get(key, "TODO")
-                    
-                    # Si es TODO, intentar recuperar del archivo
-                    if val_to_write == "TODO" or val_to_write == "":
-                        # 1. Prioridad: Archivo específico en la misma ruta
-                        if key in local_translations:
-                            val_to_write = local_translations[key]
-                        # 2. Fallback: Búsqueda global
-                        elif key in archive_translations:
-                            val_to_write = archive_translations[key]
-                        # Fallback para Backstories (baseDesc <-> description) y otros cambios comunes
-                        elif key.endswith('.baseDesc') and (key.replace('.baseDesc', '.description') in archive_translations):
-                            val_to_write = archive_translations[key.replace('.baseDesc', '.description')]
-                        elif key.endswith('.description') and (key.replace('.description', '.baseDesc') in archive_translations):
-                            val_to_write = archive_translations[key.replace('.description', '.baseDesc')]
-                        # Fallback para title <-> label
-                        elif key.endswith('.title') and (key.replace('.title', '.label') in archive_translations):
-                            val_to_write = archive_translations[key.replace('.title', '.label')]
-                        elif key.endswith('.label') and (key.replace('.label', '.title') in archive_translations):
-                            val_to_write = archive_translations[key.replace('.label', '.title')]
-                        
-                    val_to_write = escape(val_to_write)
+    def init_ui(self):
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        main_layout = QHBoxLayout(central_widget)
+        
+        # Layout izquierdo (controles principales)
+        left_layout = QVBoxLayout()
+        
+        # Layout derecho (etiquetas editables)
+        right_layout = QVBoxLayout()
+        
+        main_layout.addLayout(left_layout, stretch=3)
+        main_layout.addLayout(right_layout, stretch=1)
+        
+        layout = left_layout  # Mantener compatibilidad con el resto del código
+
+        # Selección de carpeta del Mod
+        defs_layout = QHBoxLayout()
+        self.defs_input = QLineEdit()
+        self.defs_input.setPlaceholderText("Ruta de la carpeta del Mod")
+        
+        btn_browse = QPushButton("Buscar...")
+        btn_browse.clicked.connect(self.browse_mod)
+        btn_open_mod = QPushButton("Abrir")
+        btn_open_mod.clicked.connect(lambda: self.open_folder(self.defs_input.text()))
+        defs_layout.addWidget(QLabel("Carpeta del Mod:"))
+        defs_layout.addWidget(self.defs_input)
+        defs_layout.addWidget(btn_browse)
+        defs_layout.addWidget(btn_open_mod)
+        layout.addLayout(defs_layout)
+
+        # Selección de carpeta de Archivo de Traducciones (Repositorio)
+        archive_layout = QHBoxLayout()
+        self.archive_input = QLineEdit()
+        self.archive_input.setPlaceholderText("Ruta del Archivo de Traducciones (Opcional)")
+        btn_browse_archive = QPushButton("Buscar Archivo...")
+        btn_browse_archive.clicked.connect(self.browse_archive)
+        btn_open_archive = QPushButton("Abrir")
+        btn_open_archive.clicked.connect(lambda: self.open_folder(self.archive_input.text()))
+        archive_layout.addWidget(QLabel("Archivo Traducciones:"))
+        archive_layout.addWidget(self.archive_input)
+        archive_layout.addWidget(btn_browse_archive)
+        archive_layout.addWidget(btn_open_archive)
+        layout.addLayout(archive_layout)
 
-                    f.write(f'  <!-- EN: {original_text} -->\n')
-                    f.write(f'  <{key}>{val_to_write}</{key}>\n')
+        # Nombre del lenguaje
+        lang_layout = QHBoxLayout()
+        self.lang_input = QLineEdit("SpanishLatin")
+        lang_layout.addWidget(QLabel("Lenguaje de salida:"))
+        lang_layout.addWidget(self.lang_input)
+        
+        self.version_combo = QComboBox()
+        self.version_combo.addItems(["Todas", "1.6", "1.5", "1.4", "1.3", "1.2", "1.1", "1.0", "Base"])
+        lang_layout.addWidget(QLabel("Versión:"))
+        lang_layout.addWidget(self.version_combo)
+        layout.addLayout(lang_layout)
+
+        # Opciones en menú desplegable
+        opts_layout = QHBoxLayout()
+        self.btn_options = QPushButton("Opciones")
+        
+        self.opts_menu = QMenu(self)
+        self.opts_menu.setToolTipsVisible(True)
+        self.act_popup = QAction("Mostrar aviso al finalizar", self)
+        self.act_popup.setCheckable(True)
+        self.act_popup.setChecked(True)
+        self.act_popup.setToolTip("Muestra una ventana emergente confirmando que el proceso ha terminado.")
+        self.act_readme = QAction("Crear archivo LEEME", self)
+        self.act_readme.setCheckable(True)
+        self.act_readme.setChecked(True)
+        self.act_readme.setToolTip("Genera un archivo de texto con instrucciones de instalación en la carpeta de salida.")
+        self.act_merge = QAction("Combinar todo en versión destino", self)
+        self.act_merge.setCheckable(True)
+        self.act_merge.setChecked(False)
+        self.act_merge.setToolTip("Fusiona el contenido de todas las versiones encontradas dentro de la carpeta de la versión seleccionada.")
+        self.act_simplify_mods = QAction("Integrar contenido de Mods en raíz", self)
+        self.act_simplify_mods.setCheckable(True)
+        self.act_simplify_mods.setChecked(False)
+        self.act_simplify_mods.setToolTip("Elimina la estructura de carpetas 'Mods/NombreMod' y mueve todo el contenido directamente a la carpeta principal.")
+        self.act_clean = QAction("Limpiar carpeta de salida", self)
+        self.act_clean.setCheckable(True)
+        self.act_clean.setChecked(False)
+        self.act_clean.setToolTip("Elimina la carpeta de destino antes de generar los archivos para asegurar una extracción limpia.")
+        self.act_recover_implicit = QAction("Recuperar líneas implícitas (Legacy)", self)
+        self.act_recover_implicit.setCheckable(True)
+        self.act_recover_implicit.setChecked(False)
+        self.act_recover_implicit.setToolTip("Intenta recuperar traducciones de líneas que no están en el XML (ej. deathMessage heredado) usando el archivo y validando con el inglés.")
+        self.act_strict_tags = QAction("Coincidencia exacta de etiquetas", self)
+        self.act_strict_tags.setCheckable(True)
+        self.act_strict_tags.setChecked(False)
+        self.act_strict_tags.setToolTip("Solo extrae (o descarta) las etiquetas que coinciden exactamente con las listas, en lugar de las que las contienen (ej. 'label' ya no incluye 'labelNoun'). Es más rápido.")
+        self.act_create_about = QAction("Crear About.xml (Metadata)", self)
+        self.act_create_about.setCheckable(True)
+        self.act_create_about.setChecked(True)
+        self.act_create_about.setToolTip("Genera una carpeta About con un archivo About.xml mínimo (nombre, autor, packageId) extraído del mod original.")
+        
+        self.opts_menu.addAction(self.act_popup)
+        self.opts_menu.addAction(self.act_readme)
+        self.opts_menu.addAction(self.act_merge)
+        self.opts_menu.addAction(self.act_simplify_mods)
+        self.opts_menu.addAction(self.act_clean)
+        self.opts_menu.addAction(self.act_recover_implicit)
+        self.opts_menu.addAction(self.act_strict_tags)
+        self.opts_menu.addAction(self.act_create_about)
+        self.btn_options.setMenu(self.opts_menu)
+        
+        opts_layout.addWidget(self.btn_options)
+        opts_layout.addStretch()
+        layout.addLayout(opts_layout)
+
+        # Botón principal
+        self.btn_run = QPushButton("Generar Archivos de Traducción")
+        self.btn_run.setStyleSheet("background-color: #2c3e50; color: white; font-weight: bold; padding: 10px;")
+        self.btn_run.clicked.connect(self.run_extraction)
+        layout.addWidget(self.btn_run)
+
+        # Área de log
+        self.log_output = QTextEdit()
+        self.log_output.setReadOnly(True)
+        self.log_output.setStyleSheet("background-color: #1e1e1e; color: #d4d4d4; font-family: Consolas;")
+        layout.addWidget(self.log_output)
+        
+        # --- Panel derecho: Etiquetas editables ---
+        right_layout.addWidget(QLabel("<b>Etiquetas Traducibles:</b>"))
+        self.translatable_input = QTextEdit()
+        self.translatable_input.setPlaceholderText("Separadas por comas: label, description, ...")
+        self.translatable_input.setMaximumHeight(200)
+        right_layout.addWidget(self.translatable_input)
+        
+        right_layout.addWidget(QLabel("<b>Etiquetas Excluidas:</b>"))
+        self.blacklist_input = QTextEdit()
+        self.blacklist_input.setPlaceholderText("Separadas por comas: verbClass, texPath, ...")
+        self.blacklist_input.setMaximumHeight(200)
+        right_layout.addWidget(self.blacklist_input)
+        
+        # Botón para reestablecer valores por defecto
+        btn_reset_tags = QPushButton("Restablecer por defecto")
+        btn_reset_tags.clicked.connect(self.reset_default_tags)
+        right_layout.addWidget(btn_reset_tags)
+        
+        right_layout.addStretch()
+        
+        # Cargar valores iniciales en los cuadros
+        self.load_tags_to_ui()
+
+    def auto_detect_mod(self):
+        """Usar la carpeta del script como mod si no hay otra ruta y contiene 'Defs'."""
+        if self.defs_input.text():
+            return
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        
+        # Si encontramos 'Defs' cerca (estamos en un Mod)
+        if _has_defs_nearby(script_dir):
+            self.defs_input.setText(script_dir)
+
+    def open_folder(self, path):
+        if path and os.path.exists(path):
+            QDesktopServices.openUrl(QUrl.fromLocalFile(path))
+        else:
+            QMessageBox.warning(self, "Aviso", "La ruta no existe o está vacía.")
+    
+    def load_tags_to_ui(self):
+        """Cargar las listas de etiquetas en los cuadros de texto"""
+        self.translatable_input.setPlainText(", ".join(self.translatable_tags))
+        self.blacklist_input.setPlainText(", ".join(self.blacklisted_tags))
+    
+    def update_tags_from_ui(self):
+        """Actualizar las listas desde los cuadros de texto"""
+        translatable_text = self.translatable_input.toPlainText()
+        blacklist_text = self.blacklist_input.toPlainText()
+        
+        # Parsear separando por comas y limpiando espacios
+        self.translatable_tags = [tag.strip() for tag in translatable_text.split(',') if tag.strip()]
+        self.blacklisted_tags = [tag.strip() for tag in blacklist_text.split(',') if tag.strip()]
+        # Versiones en minúsculas y sin duplicados para comparar durante la extracción
+        self._translatable_set = frozenset(sys.intern(tag.lower()) for tag in self.translatable_tags)
+        self._blacklist_set = frozenset(sys.intern(tag.lower()) for tag in self.blacklisted_tags)
+    
+    def reset_default_tags(self):
+        """Restablecer las etiquetas a los valores por defecto"""
+        self.translatable_tags = [
+            'label', 'description', 'jobString', 'reportString', 'pawnLabel', 
+            'graphLabel', 'verb', 'gerund', 'deathMessage', 'skillLabel', 
+            'labelNoun', 'labelShort', 'labelPlural', 'adjective', 'text', 
+            'rejectionMessage', 'helpText', 'labelShortAdj', 'flavorText',
+            'title', 'titleShort', 'baseDesc', 'titleFemale', 'titleShortFemale',
+            'letterLabel', 'letterText', 'extraOutcomeDesc',
+            'customLabel', 'chargeNoun', 'endMessage'
+        ]
+        self.blacklisted_tags = [
+            'verbClass', 'commandTexture', 'commandLabelKey', 'texPath', 'iconPath'
+        ]
+        self.load_tags_to_ui()
+        QMessageBox.information(self, "Restablecido", "Las etiquetas han sido restablecidas a los valores por defecto.")
+
+    def browse_mod(self):
+        start_dir = self.defs_input.text() or os.path.dirname(os.path.abspath(__file__))
+        directory = QFileDialog.getExistingDirectory(self, "Seleccionar carpeta del Mod", start_dir)
+        if directory:
+            self.defs_input.setText(directory)
+
+    def browse_archive(self):
+        directory = QFileDialog.getExistingDirectory(self, "Seleccionar carpeta de Archivo de Traducciones")
+        if directory:
+            self.archive_input.setText(directory)
+
+    def log(self, message):
+        self.log_output.append(message)
+
+    def load_config(self):
+        if os.path.exists(self.config_file):
+            try:
+                with open(self.config_file, 'rb') as f:
+                    raw = f.read()
+                    config = json.loads(raw)
+                    self._last_config_bytes = raw
+                    last_path = config.get('last_mod_path', '')
+                    if last_path and os.path.exists(last_path):
+                        self.defs_input.setText(last_path)
+                    archive_path = config.get('archive_path', '')
+                    if archive_path and os.path.exists(archive_path):
+                        self.archive_input.setText(archive_path)
+                    version = config.get('target_version', 'Todas')
+                    idx = self.version_combo.findText(version)
+                    if idx >= 0: self.version_combo.setCurrentIndex(idx)
+                    self.act_popup.setChecked(config.get('show_popup', True))
+                    self.act_readme.setChecked(config.get('create_readme', True))
+                    self.act_merge.setChecked(config.get('merge_versions', False))
+                    self.act_simplify_mods.setChecked(config.get('simplify_mods', False))
+                    self.act_clean.setChecked(config.get('clean_output', False))
+                    self.act_recover_implicit.setChecked(config.get('recover_implicit', False))
+                    self.act_strict_tags.setChecked(config.get('strict_tag_match', False))
+                    self.act_create_about.setChecked(config.get('create_about', True))
                     
-                    last_def = current_def
-                
-                # Preservar traducciones antiguas (INUTILIZADO)
-                unused_keys = [k for k in existing_translations if k not in used_keys]
-                if unused_keys:
-                    f.write('\n  <!-- INUTILIZADO -->\n')
-                    for k in unused_keys:
-                        val = existing_translations[k]
-                        f.write(f'  <!-- <{k}>{val}</{k}> -->\n')
-                
-                f.write('  \n')
-                f.write('</LanguageData>')
+                    # Cargar etiquetas personalizadas si existen
+                    if 'translatable_tags' in config:
+                        self.translatable_tags = config['translatable_tags']
+                    if 'blacklisted_tags' in config:
+                        self.blacklisted_tags = config['blacklisted_tags']
+            except Exception:
+                pass
+
+    def save_config(self):
+        try:
+            # Actualizar etiquetas desde la UI
+            self.update_tags_from_ui()
             
-            action = "Actualizado" if existing_translations else "Generado"
-            results_log.append(f"[{action}] {def_type}/{original_filename}")
-        return results_log
+            config = {
+                'last_mod_path': self.defs_input.text(),
+                'archive_path': self.archive_input.text(),
+                'target_version': self.version_combo.currentText(),
+                'show_popup': self.act_popup.isChecked(),
+                'create_readme': self.act_readme.isChecked(),
+                'merge_versions': self.act_merge.isChecked(),
+                'simplify_mods': self.act_simplify_mods.isChecked(),
+                'clean_output': self.act_clean.isChecked(),
+                'recover_implicit': self.act_recover_implicit.isChecked(),
+                'strict_tag_match': self.act_strict_tags.isChecked(),
+                'create_about': self.act_create_about.isChecked(),
+                'translatable_tags': self.translatable_tags,
+                'blacklisted_tags': self.blacklisted_tags
+            }
+            # Serializar primero y escribir solo si cambió: evita reescribir el archivo en cada extracción
+            blob = json.dumps(config, indent=2).encode('utf-8')
+            if blob == self._last_config_bytes:
+                return
+            self._last_config_bytes = blob
+            # La escritura se hace en la siguiente vuelta del bucle de eventos, no en medio del clic
+            QTimer.singleShot(0, lambda: self._write_config(blob))
+        except Exception:
+            pass
+
+    def _write_config(self, blob):
+        try:
+            # Escribir en un temporal y reemplazar: el archivo nunca queda a medio escribir
+            tmp_path = self.config_file + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, self.config_file)
+        except Exception:
+            self._last_config_bytes = None
+
+    def run_extraction(self):
+        # Actualizar las etiquetas desde la UI antes de procesar
+        self.update_tags_from_ui()
+        
+        self.save_config()
+        self.log_output.clear()
+        self.btn_run.setEnabled(False)
+
+        self.worker = ExtractionWorker(
+            Path(self.defs_input.text()), self.archive_input.text(), self.lang_input.text(),
+            self.version_combo.currentText(), self.act_merge.isChecked(), self.act_simplify_mods.isChecked(),
+            self.act_clean.isChecked(), self.act_recover_implicit.isChecked(), self.act_readme.isChecked(),
+            self.act_create_about.isChecked(), self._translatable_set, self._blacklist_set,
+            self.act_strict_tags.isChecked())
+        self.worker.log.connect(self.log)
+        self.worker.finished.connect(self._on_done)
+        self.worker.error.connect(self._on_error)
+        self.worker.start()
+
+    def _on_done(self, total_files_processed):
+        self.btn_run.setEnabled(True)
+        if total_files_processed == 0:
+            QMessageBox.warning(self, "Aviso", "No se encontraron archivos Defs ni Keyed (en inglés).")
+        elif self.act_popup.isChecked():
+            QMessageBox.information(self, "Éxito", f"Traducciones generadas en:\n{self.worker.output_root}")
+
+    def _on_error(self, message):
+        self.btn_run.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Ocurrió un error: {message}")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -1,8 +1,8 @@
 import sys
 import os
-import re
 import xml.etree.ElementTree as ET
-from xml.sax.saxutils import escape
+from functools import lru_cache
+from pathlib import Path
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                              QTextEdit, QFileDialog, QMessageBox, QProgressBar)
@@ -12,18 +12,56 @@ from PySide6.QtGui import QFont
 # Ruta por defecto de los mods de RimWorld en Steam Workshop
 DEFAULT_WORKSHOP_PATH = r"C:\Program Files (x86)\Steam\steamapps\workshop\content\294100"
 
+# Tabla para str.translate: quita ':' y cambia por '_' los demás caracteres no válidos en Windows
+_SANITIZE_TABLE = str.maketrans({':': None, **dict.fromkeys('<>"/\\|?*', '_')})
+
+@lru_cache(maxsize=4096)
 def sanitize_filename(name):
-    """Limpia el nombre para que sea válido como nombre de carpeta en Windows."""
+    """Limpia el nombre para que sea válido como nombre de carpeta en Windows.
+    Memoizado: es una función pura y los nombres se repiten entre ejecuciones."""
     if not name:
         return "Unnamed_Mod"
-    # Eliminar dos puntos
-    cleaned = name.replace(':', '')
-    # Reemplazar otros caracteres no válidos en Windows: < > " / \ | ? *
-    cleaned = re.sub(r'[<>"/\\|?*]', '_', cleaned).strip()
+    # Eliminar dos puntos y reemplazar otros caracteres no válidos en Windows: < > " / \ | ? *
+    # (una sola pasada con la tabla de traducción)
+    cleaned = name.translate(_SANITIZE_TABLE).strip()
     # Eliminar puntos al final (Windows no los quiere)
     cleaned = cleaned.rstrip('.')
     return cleaned if cleaned else "Unnamed_Mod"
 
+# &, < y > escapados con una tabla de traducción (mismo resultado que saxutils.escape)
+_XML_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+@lru_cache(maxsize=4096)
+def _escape_xml(text):
+    """Escape XML memoizado: autores y prefijos de packageId se repiten mucho entre mods."""
+    return text.translate(_XML_ESCAPE_TABLE)
+
+# Campos de About.xml que se copian a los metadatos
+_CAMPOS_ABOUT = ('name', 'author', 'packageId')
+
+def _leer_campos_about(about_xml_path):
+    """
+    Lee en streaming los campos de _CAMPOS_ABOUT que cuelgan directamente de la raíz de About.xml
+    (el primero de cada uno, como root.find) y deja de leer en cuanto los tiene todos, sin
+    recorrer la descripción, dependencias, etc. Los que no aparecen no estarán en el dict.
+    """
+    campos = {}
+    nivel = 0
+    with open(about_xml_path, 'rb') as f:
+        for evento, elem in ET.iterparse(f, events=('start', 'end')):
+            if evento == 'start':
+                nivel += 1
+                continue
+            nivel -= 1
+            # Solo los hijos directos de la raíz: las dependencias también tienen <packageId>
+            if nivel == 1:
+                if elem.tag in _CAMPOS_ABOUT and elem.tag not in campos:
+                    campos[elem.tag] = elem.text
+                    if len(campos) == len(_CAMPOS_ABOUT):
+                        break
+                elem.clear()
+    return campos
+
 class ExtractorThread(QThread):
     progress = Signal(int)
     log = Signal(str)
@@ -42,17 +80,16 @@ class ExtractorThread(QThread):
 
         self.log.emit("Escaneando carpeta de Workshop...")
         
-        # Listar subdirectorios
+        # Listar subdirectorios numéricos (IDs de Workshop) como (id, ruta).
+        # DirEntry ya sabe si es carpeta por la propia lectura del directorio, sin un stat por entrada
         try:
-            subdirs = [d for d in os.listdir(self.source_dir) if os.path.isdir(os.path.join(self.source_dir, d))]
+            with os.scandir(self.source_dir) as it:
+                workshop_mods = [(e.name, e.path) for e in it if e.name.isdigit() and e.is_dir()]
         except Exception as e:
             self.finished.emit(f"Error al leer directorio: {e}")
             return
-
-        # Filtrar solo carpetas numéricas (IDs de Workshop)
-        workshop_ids = [d for d in subdirs if d.isdigit()]
         
-        total = len(workshop_ids)
+        total = len(workshop_mods)
         if total == 0:
             self.finished.emit("No se encontraron carpetas de mods (IDs numéricos) en la ruta seleccionada.")
             return
@@ -71,12 +108,11 @@ class ExtractorThread(QThread):
             self.finished.emit(f"Error creando carpeta Metadatos_Mods: {e}")
             return
 
-        for i, mod_id in enumerate(workshop_ids):
+        for i, (mod_id, mod_path) in enumerate(workshop_mods):
             if not self.is_running:
                 self.log.emit("Proceso detenido por el usuario.")
                 break
             
-            mod_path = os.path.join(self.source_dir, mod_id)
             about_dir_source = os.path.join(mod_path, "About")
             
             # Buscar About.xml (puede ser About.xml o about.xml)
@@ -86,18 +122,13 @@ class ExtractorThread(QThread):
 
             if os.path.exists(about_xml_path):
                 try:
-                    # Parsear el XML original para obtener datos
-                    tree = ET.parse(about_xml_path)
-                    root = tree.getroot()
-                    
-                    name_node = root.find("name")
-                    author_node = root.find("author")
-                    package_id_node = root.find("packageId")
+                    # Leer del XML original solo los datos necesarios
+                    campos = _leer_campos_about(about_xml_path)
                     
                     # Obtener valores o usar defaults
-                    mod_name = name_node.text if name_node is not None and name_node.text else f"Unknown Mod {mod_id}"
-                    author = author_node.text if author_node is not None and author_node.text else "Unknown"
-                    package_id = package_id_node.text if package_id_node is not None and package_id_node.text else "Unknown.PackageId"
+                    mod_name = campos.get("name") or f"Unknown Mod {mod_id}"
+                    author = campos.get("author") or "Unknown"
+                    package_id = campos.get("packageId") or "Unknown.PackageId"
                     
                     # Sanitizar nombre para crear carpeta de destino
                     folder_name = sanitize_filename(mod_name)
@@ -108,23 +139,21 @@ class ExtractorThread(QThread):
                     os.makedirs(dest_about_path, exist_ok=True)
                     
                     # 1. Crear PublishedFileId.txt
-                    with open(os.path.join(dest_about_path, "PublishedFileId.txt"), "w", encoding="utf-8") as f:
-                        f.write(mod_id)
+                    Path(dest_about_path, "PublishedFileId.txt").write_text(mod_id, encoding="utf-8")
                         
                     # 2. Crear About.xml con el formato solicitado
                     # Construimos el string manualmente para garantizar el formato exacto y los comentarios
                     xml_content = (
                         "<ModMetaData>\n"
-                        f"\t<name>{escape(mod_name)}</name>\n"
-                        f"\t<author>{escape(author)}</author>\n"
-                        f"\t<packageId>{escape(package_id)}</packageId>\n"
+                        f"\t<name>{_escape_xml(mod_name)}</name>\n"
+                        f"\t<author>{_escape_xml(author)}</author>\n"
+                        f"\t<packageId>{_escape_xml(package_id)}</packageId>\n"
                         f"\t<!-- PublishedFileId: {mod_id} -->\n"
                         "</ModMetaData>"
                     )
                     
                     about_filename = f"About_{mod_id}.xml"
-                    with open(os.path.join(dest_about_path, about_filename), "w", encoding="utf-8") as f:
-                        f.write(xml_content)
+                    Path(dest_about_path, about_filename).write_text(xml_content, encoding="utf-8")
                         
                     self.log.emit(f"Extraído: {mod_name} ({mod_id})")
                     processed_count += 1